@@ -0,0 +1,66 @@
+import io
+import random
+
+from vt100_toolkit.emulator import VirtualTerminal
+from vt100_toolkit.terminal import Terminal
+
+# The tracked cursor must match the cursor of the emulator fed with the output
+
+class FakeTerminal(Terminal):
+
+    ROWS, COLUMNS = 10, 20
+
+    def __init__(self) -> None:
+        super().__init__(cache=False)
+        self._stdout = io.StringIO()
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.ROWS, self.COLUMNS
+
+def emulate(terminal: FakeTerminal) -> VirtualTerminal:
+    vt = VirtualTerminal(FakeTerminal.ROWS, FakeTerminal.COLUMNS)
+    vt.feed(terminal._stdout.getvalue())
+    return vt
+
+# a line filling the last column leaves a pending wrap, the position is then unknown
+terminal = FakeTerminal()
+terminal.clear()
+terminal.print('x' * 45)
+assert tuple(terminal.tracked_cursor) == emulate(terminal).cursor == (4, 1)
+terminal.write('x' * 20)
+assert terminal.tracked_cursor is None
+
+# control characters
+terminal = FakeTerminal()
+terminal.clear()
+terminal.write('abc\rd\te\b\bf\tgh\tij\t\tk')
+assert tuple(terminal.tracked_cursor) == emulate(terminal).cursor
+terminal.write('\x0b')
+assert terminal.tracked_cursor is None
+
+random.seed(1)
+texts = ('ab', '\n', '\r', '\b', '\t', '\x1b[1mb\x1b[0m', '<red>r</>')
+checked = 0
+for _ in range(2000):
+    terminal = FakeTerminal()
+    terminal.clear()
+    for _ in range(random.randint(1, 8)):
+        choices = texts + ('x' * random.randint(0, 45),)
+        text = ''.join(random.choice(choices) for _ in range(random.randint(0, 5)))
+        match random.randrange(4):
+            case 0:
+                terminal.print(text.replace('<red>', '').replace('</>', ''))
+            case 1:
+                terminal.printc(text.replace('\x1b[1m', '').replace('\x1b[0m', ''))
+            case 2:
+                terminal.write(text.replace('<red>', '').replace('</>', ''))
+            case 3:
+                row = random.randint(1, FakeTerminal.ROWS)
+                column = random.randint(1, FakeTerminal.COLUMNS)
+                terminal.move_cursor(row, column)
+        if terminal.tracked_cursor is not None:
+            checked += 1
+            output = terminal._stdout.getvalue()
+            assert tuple(terminal.tracked_cursor) == emulate(terminal).cursor, repr(output)
+print(f'{checked} cursor positions checked')
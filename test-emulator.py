@@ -0,0 +1,52 @@
+import time
+
+from vt100_toolkit.emulator import Style, VirtualTerminal
+
+# Sequences found in recorded sessions must not break the emulator
+vt = VirtualTerminal(rows=5, columns=20)
+vt.feed('\x1b[4:3mcurly\x1b[4:0m ')
+vt.feed('\x1b[38:2::255:0:0mred\x1b[m ')
+vt.feed('\x1b[38:5:4mblue\x1b[m\r\n')
+# xterm modifyOtherKeys, kitty keyboard protocol, SGR mouse report
+vt.feed('\x1b[>4;1m\x1b[=5u\x1b[?u\x1b[<0;1;1Mtext\x1b[?25l')
+vt.feed('\x1b[58;2;1;2;3m\x1b[58:5:3mfoo\x1b[m')
+vt.feed('\x1b[' + '9' * 5000 + 'm\x1b[99999999999;1H')
+print(vt.snapshot())
+assert vt.line(0) == 'curly red blue'
+assert vt.cell(0, 0)[1] == Style(attributes=1 << 3)
+assert vt.cell(0, 5)[1] == Style()
+assert vt.cell(0, 6)[1] == Style(foreground=(255, 0, 0))
+assert vt.cell(0, 10)[1] == Style(foreground=4)
+assert vt.line(1) == 'textfoo'
+assert vt.cell(1, 0)[1] == Style()
+assert vt.cell(1, 4)[1] == Style()
+assert not vt.cursor_visible
+assert vt.cursor == (5, 1)
+
+# The SGR cache is bounded
+vt = VirtualTerminal()
+for i in range(3 * VirtualTerminal.CACHE_SIZE):
+    vt.feed(f'\x1b[38;2;{i % 256};{i // 256};0mx')
+assert len(vt._sgr_cache) <= VirtualTerminal.CACHE_SIZE
+
+# Throughput in MB/s, the floors are conservative since the speed of a shared machine varies
+FLOORS = {'plain': 10, 'SGR': 5, 'CUP': 5}
+RUNS = 3
+words = ('lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit')
+plain = ''.join(' '.join(words[(i + j) % 8] for j in range(10)) + '\n' for i in range(50000))
+sgr = ''.join(
+    ' '.join(f'\x1b[{31 + (i + j) % 7}m{words[(i + j) % 8]}\x1b[0m' for j in range(8)) + '\n'
+    for i in range(20000)
+)
+cup = ''.join(f'\x1b[{i % 24 + 1};{i % 70 + 1}H{words[i % 8]}' for i in range(100000))
+for name, data in (('plain', plain), ('SGR', sgr), ('CUP', cup)):
+    throughput = 0
+    for _ in range(RUNS):
+        vt = VirtualTerminal()
+        start = time.perf_counter()
+        for i in range(0, len(data), 64 * 1024):
+            vt.feed(data[i:i + 64 * 1024])
+        elapsed = time.perf_counter() - start
+        throughput = max(throughput, len(data) / elapsed / 1e6)
+    print(f'{name:5} {throughput:5.1f} MB/s (floor {FLOORS[name]} MB/s)')
+    assert throughput >= FLOORS[name], f'{name} throughput {throughput:.1f} MB/s'
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+# Import time budget in ms of vt100_toolkit.terminal, excluding the interpreter startup
+BUDGET = 10
+RUNS = 5
+
+# modules which must be imported on demand
+FORBIDDEN = ('termios', 'tty', 'enum', 're', 'typing', 'contextlib', 'pathlib', 'dataclasses')
+
+# the modules already imported by the interpreter startup, e.g. by site, are not counted
+code = (
+    'import sys; before = set(sys.modules); import vt100_toolkit.terminal; '
+    'print(" ".join(set(sys.modules) - before))'
+)
+
+best = None
+for _ in range(RUNS):
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # import time: self [us] | cumulative | imported package
+    timings = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line.split('|')
+        self_time = self_time.split(':')[1]
+        timings[name.strip()] = int(self_time), int(cumulative)
+    total = sum(_[0] for name, _ in timings.items() if name.startswith('vt100_toolkit'))
+    if best is None or total < best[0]:
+        best = total, timings
+    modules = set(process.stdout.split())
+
+total, timings = best
+print(f'vt100_toolkit import time: {total / 1000:.1f} ms (budget {BUDGET} ms)')
+# slowest modules
+for name, (self_time, cumulative) in sorted(timings.items(), key=lambda _: -_[1][0])[:10]:
+    print(f'  {self_time:6} us  {cumulative:6} us  {name}')
+
+imported = [_ for _ in FORBIDDEN if _ in modules]
+assert not imported, f'imported at startup: {imported}'
+assert total <= BUDGET * 1000, f'import time {total / 1000:.1f} ms exceeds {BUDGET} ms'
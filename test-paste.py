@@ -0,0 +1,55 @@
+import os
+
+from vt100_toolkit import vt100
+from vt100_toolkit.vt100_io import TerminalInput
+
+# A bracketed paste is fed through a pipe instead of a TTY, the reads return up to chunk_size bytes
+
+def make_input(data: bytes, paste_limit: int = None) -> TerminalInput:
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, data)
+    os.close(write_fd)
+    stdin = TerminalInput(paste_limit=paste_limit)
+    stdin._fileno = read_fd
+    return stdin
+
+text = 'héllo wörld € 😀\nsecond line'
+data = (vt100.PASTE_START + text + vt100.PASTE_END + 'x€\x1b[A').encode()
+
+# small chunks split the end marker and the multi-byte characters
+for chunk_size in range(1, 16):
+    stdin = make_input(data)
+    assert stdin.read_key() == vt100.PASTE_START
+    chunks = list(stdin.iter_paste(chunk_size))
+    assert ''.join(chunks) == text, (chunk_size, chunks)
+    assert all('�' not in _ for _ in chunks)
+    # the bytes after the end marker are the next keys
+    assert stdin.read_key() == 'x'
+    assert stdin.read_key() == '€'
+    assert stdin.read_key() == '\x1b[A'
+    assert stdin.read_key() == ''
+    os.close(stdin._fileno)
+
+# a paste without end marker stops at the end of file
+stdin = make_input((vt100.PASTE_START + text).encode())
+assert stdin.read_key() == vt100.PASTE_START
+assert stdin.read_paste() == text
+os.close(stdin._fileno)
+
+# a paste over the limit is consumed, then the input goes on
+stdin = make_input(data, paste_limit=5)
+assert stdin.read_key() == vt100.PASTE_START
+try:
+    stdin.read_paste()
+    raise AssertionError('the paste limit is not enforced')
+except ValueError:
+    pass
+assert stdin.read_key() == 'x'
+os.close(stdin._fileno)
+
+stdin = make_input(data, paste_limit=len(text))
+assert stdin.read_key() == vt100.PASTE_START
+assert stdin.read_paste() == text
+os.close(stdin._fileno)
+
+print('paste ok')
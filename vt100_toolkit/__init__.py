@@ -0,0 +1,65 @@
+####################################################################################################
+#
+# vt100_toolkit — A VT100 library
+# Copyright (C) 2026 Fabrice SALVAIRE
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+####################################################################################################
+
+"""A VT100 library.
+
+The submodules and the main classes are imported on demand, thus `import vt100_toolkit` is
+instant.
+
+"""
+
+####################################################################################################
+
+# name -> submodule
+_LAZY_ATTRIBUTES = {
+    'Capabilities': 'capabilities',
+    'CapabilityCache': 'capabilities',
+    'Column': 'table',
+    'Pager': 'pager',
+    'TableRenderer': 'table',
+    'Terminal': 'terminal',
+    'TerminalInput': 'vt100_io',
+    'TextLayout': 'layout',
+    'Theme': 'terminal',
+    'VirtualTerminal': 'emulator',
+    'cursor_motion': 'cursor',
+}
+
+_SUBMODULES = (
+    'ansi',
+    'capabilities',
+    'cursor',
+    'emulator',
+    'layout',
+    'pager',
+    'table',
+    'terminal',
+    'types',
+    'vt100',
+    'vt100_io',
+)
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+####################################################################################################
+
+def __getattr__(name: str):
+    import importlib
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is not None:
+        module = importlib.import_module(f'.{module_name}', __name__)
+        value = getattr(module, name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_SUBMODULES))
@@ -0,0 +1,146 @@
+####################################################################################################
+#
+# vt100_toolkit — A VT100 library
+# Copyright (C) 2026 Fabrice SALVAIRE
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+####################################################################################################
+
+"""This module defines the ANSI codes as enumerations.
+
+These enumerations are convenient for an application, but building them has a cost at import, thus
+`vt100` uses plain constants and loads this module on demand.
+
+"""
+
+####################################################################################################
+
+from enum import IntEnum, StrEnum
+
+####################################################################################################
+
+__all__ = ['AnsiBackground', 'AnsiForeground', 'AnsiStyle', 'C0ControlCodes']
+
+####################################################################################################
+
+class C0ControlCodes(StrEnum):
+    # https://en.wikipedia.org/wiki/ASCII
+    # first 32 characters of 128 ASCII 7-bit
+    # NULL = 0
+    BELL = '\a'   # 0x07
+    BACKSPACE = '\b'   # 0x08
+    TAB = '\t'   # 0x09
+    LINEFEED = '\n'   # 0x0A
+    FORMFEED = '\f'   # 0x0C
+    CARRIAGE_RETURN = '\r'   # 0x0D
+    ESCAPE = '\033'   # \e 0x1B
+    # end of C0 block, then
+    # SPACE = 0x20
+
+class AnsiStyle(IntEnum):
+    RESET = 0
+    #: Increased intensity
+    BRIGHT = 1
+    #: Decreased intensity
+    FAINT = 2
+    ITALIC = 3
+    UNDERLINE = 4
+    #: slow blinking
+    BLINK = 5
+    #: mainly unsupported
+    RAPID_BLINK = 6
+    #: Reverse Video
+    INVERT = 7
+    HIDE = 8
+    STRIKE = 9
+    # PRIMARY_FONT = 10
+    # Alternative Font = 11 - 19
+    # FRAKTUR = 20
+    DOUBLY_UNDERLINED = 21
+    #: Normal intensity
+    NORMAL = 22
+    #: Neither italic, nor blackletter
+    NOT_ITALIC = 23
+    NOT_UNDERLINE = 24
+    NOT_BLINK = 25
+    # Proportional spacing = 26
+    NOT_INVERT = 27
+    #: Reveal
+    NOT_HIDE = 28
+    NOT_STRIKE = 29
+    # 30–37 Set foreground color
+    FG_BLACK = 30
+    FG_RED = 31
+    FG_GREEN = 32
+    FG_YELLOW = 33
+    FG_BLUE = 34
+    FG_MAGENTA = 35
+    FG_CYAN = 36
+    FG_WHITE = 37
+    #: Set foreground color
+    #    Next arguments are 5;n or 2;r;g;b
+    FOREGROUND = 38
+    #: Default foreground color
+    #    Implementation defined (according to standard)
+    FG_DEFAULT = 39
+    # 40–47 Set background color
+    BG_BLACK = 40
+    BG_RED = 41
+    BG_GREEN = 42
+    BG_YELLOW = 43
+    BG_BLUE = 44
+    BG_MAGENTA = 45
+    BG_CYAN = 46
+    BG_WHITE = 47
+    #: Set background color
+    #    Next arguments are 5;n or 2;r;g;b
+    BACKGROUND = 48
+    #: Default background color
+    #    Implementation defined (according to standard)
+    BG_DEFAULT = 49
+    # Disable proportional spacing = 50
+    # ...
+    # Set bright foreground color = 90 - 97
+    # Set bright background color = 100 - 107
+
+class AnsiForeground(IntEnum):
+    BLACK = 30
+    RED = 31
+    GREEN = 32
+    YELLOW = 33
+    BLUE = 34
+    MAGENTA = 35
+    CYAN = 36
+    WHITE = 37
+    DEFAULT = 39
+
+    # These are fairly well supported, but not part of the standard.
+    BRIGHT_BLACK = 90
+    BRIGHT_RED = 91
+    BRIGHT_GREEN = 92
+    BRIGHT_YELLOW = 93
+    BRIGHT_BLUE = 94
+    BRIGHT_MAGENTA = 95
+    BRIGHT_CYAN = 96
+    BRIGHT_WHITE = 97
+
+class AnsiBackground(IntEnum):
+    BLACK = 40
+    RED = 41
+    GREEN = 42
+    YELLOW = 43
+    BLUE = 44
+    MAGENTA = 45
+    CYAN = 46
+    WHITE = 47
+    DEFAULT = 49
+
+    # These are fairly well supported, but not part of the standard.
+    BRIGHT_BLACK = 100
+    BRIGHT_RED = 101
+    BRIGHT_GREEN = 102
+    BRIGHT_YELLOW = 103
+    BRIGHT_BLUE = 104
+    BRIGHT_MAGENTA = 105
+    BRIGHT_CYAN = 106
+    BRIGHT_WHITE = 107
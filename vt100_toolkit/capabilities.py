@@ -0,0 +1,275 @@
+####################################################################################################
+#
+# vt100_toolkit — A VT100 library
+# Copyright (C) 2026 Fabrice SALVAIRE
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+####################################################################################################
+
+"""This module implements a persistent cache of the terminal capabilities.
+
+Querying a terminal requires a round trip on the TTY, and some terminals never answer.  Short-lived
+command line tools pay this cost at each invocation, thus the capabilities are probed once and
+stored on disk.
+
+The cache is keyed by the `TERM`, `TERM_PROGRAM` and `COLORTERM` environment variables, the TTY
+device and the session id.  Thus a new terminal window or a new login session probes again.  An
+entry expires after `CapabilityCache.TTL` seconds and can be invalidated explicitly.  If the terminal
+didn't answer, e.g. over a slow SSH link, the entry expires after `CapabilityCache.NEGATIVE_TTL`.
+
+This module is imported at the first query, thus it avoids the slow imports like dataclasses,
+pathlib or hashlib.
+
+"""
+
+####################################################################################################
+
+import json
+import os
+import time
+
+from .types import RGBColor
+
+####################################################################################################
+
+__all__ = ['Capabilities', 'CapabilityCache', 'color_depth', 'probe']
+
+####################################################################################################
+
+def color_depth(environ: dict = None) -> int:
+    """Return the colour depth in bits guessed from the environment: 24, 8, 4 or 0."""
+    if environ is None:
+        environ = os.environ
+    colorterm = environ.get('COLORTERM', '').lower()
+    term = environ.get('TERM', '').lower()
+    if colorterm in ('truecolor', '24bit'):
+        return 24
+    if '256color' in term:
+        return 8
+    if term in ('', 'dumb'):
+        return 0
+    return 4
+
+####################################################################################################
+
+class Capabilities:
+
+    FIELDS = (
+        'color_depth',
+        'foreground_color',
+        'background_color',
+        'synchronized_output',
+        'device_attributes',
+        'timestamp',
+    )
+
+    ##############################################
+
+    def __init__(
+            self,
+            color_depth: int = 0,
+            foreground_color: RGBColor = None,
+            background_color: RGBColor = None,
+            synchronized_output: bool = False,
+            device_attributes: list[int] = None,
+            timestamp: float = None,
+    ) -> None:
+        """`device_attributes` is the Primary Device Attributes reply, None if the terminal
+        didn't answer.
+        """
+        self.color_depth = color_depth
+        self.foreground_color = foreground_color
+        self.background_color = background_color
+        self.synchronized_output = synchronized_output
+        self.device_attributes = device_attributes
+        if timestamp is None:
+            timestamp = time.time()
+        self.timestamp = timestamp
+
+    ##############################################
+
+    @staticmethod
+    def _is_int(value) -> bool:
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    @classmethod
+    def _is_int_list(cls, value, size: int = None) -> bool:
+        return (
+            isinstance(value, list)
+            and (size is None or len(value) == size)
+            and all(cls._is_int(_) for _ in value)
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Capabilities':
+        """Raise ValueError if the data is malformed, e.g. a corrupted cache entry."""
+        if not isinstance(data, dict):
+            raise ValueError(f"capabilities must be a dict, not {type(data).__name__}")
+        checks = {
+            'color_depth': cls._is_int,
+            'foreground_color': lambda _: _ is None or cls._is_int_list(_, 3),
+            'background_color': lambda _: _ is None or cls._is_int_list(_, 3),
+            'synchronized_output': lambda _: isinstance(_, bool),
+            'device_attributes': lambda _: _ is None or cls._is_int_list(_),
+            'timestamp': lambda _: cls._is_int(_) or isinstance(_, float),
+        }
+        data = {_: data[_] for _ in cls.FIELDS if _ in data}
+        for name, value in data.items():
+            if not checks[name](value):
+                raise ValueError(f"invalid capability {name} {value!r}")
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        return {_: getattr(self, _) for _ in self.FIELDS}
+
+    ##############################################
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Capabilities):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{_}={getattr(self, _)!r}' for _ in self.FIELDS)
+        return f'{self.__class__.__name__}({fields})'
+
+####################################################################################################
+
+def probe(terminal) -> Capabilities:
+    """Query the terminal capabilities.
+
+    The device attributes are queried first: if the terminal doesn't answer, the other queries are
+    skipped so we wait at most one timeout.
+
+    """
+    capabilities = Capabilities(color_depth=color_depth())
+    if not terminal.is_tty:
+        return capabilities
+    capabilities.device_attributes = terminal.query_device_attributes()
+    if capabilities.device_attributes is None:
+        return capabilities
+    capabilities.synchronized_output = terminal.query_synchronized_output()
+    capabilities.foreground_color = terminal.query_foreground_color()
+    capabilities.background_color = terminal.query_background_color()
+    return capabilities
+
+####################################################################################################
+
+class CapabilityCache:
+
+    #: Time to live of an entry in seconds
+    TTL = 24 * 3600
+    #: Time to live of an entry when the terminal didn't answer, e.g. a slow SSH link
+    NEGATIVE_TTL = 60
+
+    ENVIRONMENT_KEYS = ('TERM', 'TERM_PROGRAM', 'COLORTERM')
+
+    ##############################################
+
+    @staticmethod
+    def default_path() -> str:
+        path = os.environ.get('XDG_CACHE_HOME')
+        if not path:
+            path = os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(path, 'vt100_toolkit')
+
+    ##############################################
+
+    def __init__(
+            self,
+            path: str | os.PathLike = None,
+            ttl: float = None,
+            negative_ttl: float = None,
+    ) -> None:
+        if path is None:
+            path = self.default_path()
+        self._path = os.fspath(path)
+        if ttl is None:
+            ttl = self.TTL
+        self._ttl = ttl
+        if negative_ttl is None:
+            negative_ttl = self.NEGATIVE_TTL
+        self._negative_ttl = negative_ttl
+
+    ##############################################
+
+    @classmethod
+    def key(cls, fileno: int) -> str:
+        """Return the cache key for the TTY `fileno`, None if it is not a TTY."""
+        try:
+            device = os.ttyname(fileno)
+            session = os.getsid(0)
+        except OSError:
+            return None
+        parts = [os.environ.get(_, '') for _ in cls.ENVIRONMENT_KEYS]
+        parts += [device, str(session)]
+        # a readable file name
+        return '-'.join(
+            ''.join(c if c.isascii() and (c.isalnum() or c in '._') else '_' for c in part)
+            for part in parts
+        )
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self._path, f'{key}.json')
+
+    ##############################################
+
+    def load(self, key: str) -> Capabilities:
+        """Return the cached capabilities, None if missing, malformed or expired.
+
+        An entry for a terminal which didn't answer DA1 expires after `NEGATIVE_TTL`.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+            if not isinstance(data, dict) or 'timestamp' not in data:
+                raise ValueError("missing timestamp")
+            capabilities = Capabilities.from_dict(data)
+        except (OSError, ValueError):
+            return None
+        if capabilities.device_attributes is None:
+            ttl = self._negative_ttl
+        else:
+            ttl = self._ttl
+        # NaN or a timestamp in the future are expired as well
+        if not 0 <= time.time() - capabilities.timestamp <= ttl:
+            self.invalidate(key)
+            return None
+        return capabilities
+
+    ##############################################
+
+    def save(self, key: str, capabilities: Capabilities) -> None:
+        # The cache is an optimisation, thus an IO error is not fatal
+        path = self._entry_path(key)
+        try:
+            os.makedirs(self._path, exist_ok=True)
+            # write atomically, a concurrent process could read the entry
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as fh:
+                json.dump(capabilities.to_dict(), fh)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    ##############################################
+
+    def invalidate(self, key: str = None) -> None:
+        """Remove the entry `key`, or all the entries if `key` is None."""
+        if key is not None:
+            paths = [self._entry_path(key)]
+        else:
+            try:
+                paths = [
+                    os.path.join(self._path, _)
+                    for _ in os.listdir(self._path)
+                    if _.endswith('.json')
+                ]
+            except OSError:
+                paths = []
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
@@ -0,0 +1,104 @@
+####################################################################################################
+#
+# vt100_toolkit — A VT100 library
+# Copyright (C) 2026 Fabrice SALVAIRE
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+####################################################################################################
+
+"""This module implements a cursor motion optimizer, like the curses `mvcur` function.
+
+For a move, it computes the candidate sequences using CUP, CHA, CUU/CUD/CUF/CUB, CR/LF/BS and
+overwriting the characters already displayed, and returns the shortest one.
+
+Positions are 1-based as in `vt100.cursor_position`.
+
+"""
+
+####################################################################################################
+
+from .vt100 import CSI
+
+####################################################################################################
+
+__all__ = ['cursor_motion']
+
+####################################################################################################
+
+def _csi(n: int, code: str) -> str:
+    # the default parameter is 1, thus it can be omitted
+    if n == 1:
+        return CSI + code
+    return CSI + str(n) + code
+
+def _cup(row: int, column: int) -> str:
+    if column == 1:
+        if row == 1:
+            return CSI + 'H'
+        return CSI + str(row) + 'H'
+    if row == 1:
+        return CSI + ';' + str(column) + 'H'
+    return CSI + str(row) + ';' + str(column) + 'H'
+
+def _printable(text: str) -> bool:
+    # ASCII only, a wide character would break the column count
+    return text.isascii() and text.isprintable()
+
+####################################################################################################
+
+def _vertical_motions(row: int, column: int, to_row: int) -> list[tuple[str, int]]:
+    # Return a list of (sequence, column after the move)
+    dr = to_row - row
+    if dr == 0:
+        return [('', column)]
+    if dr < 0:
+        return [(_csi(-dr, 'A'), column)]
+    # LF never scrolls since the target row is on the screen
+    # the TTY translates LF to CR LF (ONLCR output mode), thus the cursor goes to the first column
+    return [(_csi(dr, 'B'), column), ('\n' * dr, 1)]
+
+def _horizontal_motions(column: int, to_column: int, line: str) -> list[str]:
+    dc = to_column - column
+    if dc == 0:
+        return ['']
+    motions = [_csi(to_column, 'G')]
+    if to_column == 1:
+        motions.append('\r')
+    elif dc > 0:
+        motions.append(_csi(dc, 'C'))
+        if line is not None and to_column - 1 <= len(line):
+            text = line[column-1:to_column-1]
+            if _printable(text):
+                motions.append(text)
+    else:
+        motions.append(_csi(-dc, 'D'))
+        motions.append('\b' * -dc)
+    if to_column > 1 and column != 1:
+        # carriage return then move forward
+        motions.append('\r' + _csi(to_column - 1, 'C'))
+        if line is not None and to_column - 1 <= len(line):
+            text = line[:to_column-1]
+            if _printable(text):
+                motions.append('\r' + text)
+    return motions
+
+def cursor_motion(row: int, column: int, to_row: int, to_column: int, line: str = None) -> str:
+    """Return the shortest sequence to move the cursor from (row, column) to (to_row, to_column).
+
+    If `line` is the text displayed on the target row, the cursor can move forward by overwriting
+    the characters in place.  The caller must guarantee these characters are displayed with the
+    current SGR state, else they would change of style.  Thus `line` must be None if the row is
+    styled differently.
+
+    """
+    if row is None or column is None:
+        return _cup(to_row, to_column)
+    best = _cup(to_row, to_column)
+    for vertical, _column in _vertical_motions(row, column, to_row):
+        if len(vertical) >= len(best):
+            continue
+        for horizontal in _horizontal_motions(_column, to_column, line):
+            sequence = vertical + horizontal
+            if len(sequence) < len(best):
+                best = sequence
+    return best
@@ -0,0 +1,981 @@
+####################################################################################################
+#
+# vt100_toolkit — A VT100 library
+# Copyright (C) 2026 Fabrice SALVAIRE
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+####################################################################################################
+
+"""This module implements a headless virtual terminal.
+
+It applies an escape sequence stream, e.g. the output of `Terminal`, to an in-memory screen and
+scrollback, so the display can be verified, snapshotted and diffed without a real terminal.
+
+The screen is stored as a list of rows, a row is a pair of arrays of unsigned int: the code points
+and the style ids.  The styles are interned.  Thus scrolling moves rows and a scrolled out row goes
+to the scrollback as is.  The stream is split by a regular expression in text runs and control
+sequences, a text run is written in the arrays by slices.  Fast paths handle the frequent cases:
+lines scrolling at the bottom of the screen, also coloured by SGR sequences, runs of SGR and CUP
+sequences and texts which are split at once, and cached SGR and CUP parameters.
+
+It implements:
+- C0 controls: BS HT LF VT FF CR
+- cursor moves: CUU CUD CUF CUB CNL CPL CHA CUP HVP VPA, save and restore
+- erase: ED EL ECH, insert and delete: ICH DCH IL DL
+- scroll: SU SD, scrolling region (DECSTBM), IND RI NEL
+- SGR including 256 and true colours, and the ITU T.416 sub-parameters, e.g. 38:2::r:g:b or 4:3
+- modes: autowrap, cursor visibility, alternate screen, bracketed paste and synchronized output
+- window title
+
+The other sequences are ignored, in particular the private ones with a < = or > prefix, e.g. xterm
+modifyOtherKeys.  Wide characters are not supported, a character is a cell.
+
+"""
+
+####################################################################################################
+
+from array import array
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate
+from operator import mul
+from typing import NamedTuple
+import codecs
+import re
+import sys
+
+####################################################################################################
+
+__all__ = ['Style', 'VirtualTerminal']
+
+####################################################################################################
+
+class Style(NamedTuple):
+    #: None for default, an int for an indexed colour or a (r, g, b) tuple
+    foreground: int | tuple[int, int, int] = None
+    background: int | tuple[int, int, int] = None
+    #: bit mask of the ATTRIBUTES
+    attributes: int = 0
+
+####################################################################################################
+
+# SGR attributes to bit mask
+ATTRIBUTES = {
+    1: 1 << 0,   # bright
+    2: 1 << 1,   # faint
+    3: 1 << 2,   # italic
+    4: 1 << 3,   # underline
+    5: 1 << 4,   # blink
+    6: 1 << 4,   # rapid blink
+    7: 1 << 5,   # invert
+    8: 1 << 6,   # hide
+    9: 1 << 7,   # strike
+    21: 1 << 8,   # doubly underlined
+}
+
+# SGR reset attribute to bit mask
+RESET_ATTRIBUTES = {
+    22: ATTRIBUTES[1] | ATTRIBUTES[2],
+    23: ATTRIBUTES[3],
+    24: ATTRIBUTES[4] | ATTRIBUTES[21],
+    25: ATTRIBUTES[5],
+    27: ATTRIBUTES[7],
+    28: ATTRIBUTES[8],
+    29: ATTRIBUTES[9],
+}
+
+SPACE = ord(' ')
+
+# UTF-32 in the native byte order, to fill an array('I') from a string
+UTF32 = 'utf-32-le' if sys.byteorder == 'little' else 'utf-32-be'
+
+####################################################################################################
+
+class VirtualTerminal:
+
+    SEQUENCE_RE = re.compile(
+        # the lookahead lets the regex engine skip the text runs quickly
+        r'(?=[\x00-\x09\x0b\x0c\x0e-\x1f\x7f])(?:'
+        r'\x1b\[(?P<csi_params>[0-?]*)(?P<csi_inter>[ -/]*)(?P<csi_final>[@-~])'
+        r'|\x1b\](?P<osc>[^\x07\x1b]*)(?:\x07|\x1b\\)'
+        r'|\x1b(?P<esc>[^\[\]])'
+        # CR and LF are handled in the text runs, see _write_text
+        r'|(?P<ctrl>[\x00-\x09\x0b\x0c\x0e-\x1f\x7f])'
+        r')'
+    )
+
+    # a run of SGR and CUP sequences and texts without control, see _write_csi_run
+    CSI_RUN_RE = re.compile(r'(?:\x1b\[[0-9:;]*[Hm][^\x00-\x1f\x7f]*)+')
+    CSI_RUN_SPLIT_RE = re.compile(r'\x1b\[([0-9:;]*)([Hm])')
+
+    # the end of lines made of texts and SGR sequences, see _scroll_lines
+    SGR_LINES_END_RE = re.compile(
+        r'(?=[\x00-\x09\x0b-\x1f\x7f])'
+        r'(?:[\x00-\x09\x0b\x0c\x0e-\x1a\x1c-\x1f\x7f]|\r(?!\n)|\x1b(?!\[[0-9:;]*m))'
+    )
+    SGR_SPLIT_RE = re.compile(r'\x1b\[([0-9:;]*)m')
+
+    #: An incomplete sequence at the end of a chunk is kept until the next one, up to this length
+    MAX_SEQUENCE_LENGTH = 256
+
+    TAB_SIZE = 8
+
+    MAX_PARAMETER = 65535
+
+    #: Maximum number of entries of the SGR, SGR run and CUP caches
+    CACHE_SIZE = 4096
+
+    ##############################################
+
+    def __init__(
+            self,
+            rows: int = 24,
+            columns: int = 80,
+            scrollback: int = 1000,
+            newline_mode: bool = True,
+    ) -> None:
+        """`newline_mode` means LF implies CR, like the TTY ONLCR output mode."""
+        self._rows = rows
+        self._columns = columns
+        self._newline_mode = bool(newline_mode)
+        self._scrollback = deque(maxlen=scrollback)
+        self._styles = [Style()]
+        self._style_ids = {Style(): 0}
+        # (style id, SGR parameters) -> style id
+        self._sgr_cache = {}
+        # (style id, SGR parameters, ...) -> (style ids as bytes, last style id), see _sgr_styles
+        self._sgr_run_cache = {}
+        # CUP parameters -> (y, x)
+        self._cup_cache = {}
+        self._space_row = array('I', [SPACE]) * columns
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._pending = ''
+        self._csi_handlers = {
+            '@': self._insert_characters,
+            'A': lambda p: self._move(-self._arg(p), 0),
+            'B': lambda p: self._move(self._arg(p), 0),
+            'C': lambda p: self._move(0, self._arg(p)),
+            'D': lambda p: self._move(0, -self._arg(p)),
+            'E': lambda p: self._goto(self._y + self._arg(p), 0),
+            'F': lambda p: self._goto(self._y - self._arg(p), 0),
+            'G': lambda p: self._goto(self._y, self._arg(p) - 1),
+            'H': self._cursor_position,
+            'J': self._erase_display,
+            'K': self._erase_line,
+            'L': self._insert_lines,
+            'M': self._delete_lines,
+            'P': self._delete_characters,
+            'S': lambda p: self._scroll_up(self._arg(p)),
+            'T': lambda p: self._scroll_down(self._arg(p)),
+            'X': self._erase_characters,
+            'd': lambda p: self._goto(self._arg(p) - 1, self._x),
+            'f': self._cursor_position,
+            'm': self._sgr,
+            'r': self._set_scrolling_region,
+            's': lambda p: self._save_cursor(),
+            'u': lambda p: self._restore_cursor(),
+            'h': lambda p: self._set_mode(p, True),
+            'l': lambda p: self._set_mode(p, False),
+        }
+        self.reset()
+
+    ##############################################
+
+    def reset(self) -> None:
+        self._chars, self._attrs = self._blank_screen()
+        self._alternate = None
+        self._x = 0
+        self._y = 0
+        self._style = 0
+        self._saved_cursor = (0, 0, 0)
+        self._top = 0
+        self._bottom = self._rows - 1
+        self.autowrap = True
+        self.cursor_visible = True
+        self.bracketed_paste = False
+        self.synchronized_output = False
+        self.title = ''
+
+    ##############################################
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    @property
+    def columns(self) -> int:
+        return self._columns
+
+    @property
+    def cursor(self) -> tuple[int, int]:
+        """Cursor position, 1-based as `vt100.cursor_position`"""
+        return self._y + 1, min(self._x, self._columns - 1) + 1
+
+    @property
+    def is_alternate_screen(self) -> bool:
+        return self._alternate is not None
+
+    ##############################################
+
+    @staticmethod
+    def _decode(chars: array) -> str:
+        return chars.tobytes().decode(UTF32).rstrip()
+
+    def line(self, row: int) -> str:
+        """Return the text of the 0-based row, without trailing spaces"""
+        return self._decode(self._chars[row])
+
+    @property
+    def display(self) -> list[str]:
+        return [self._decode(_) for _ in self._chars]
+
+    @property
+    def scrollback(self) -> list[str]:
+        return [self._decode(_[0]) for _ in self._scrollback]
+
+    def cell(self, row: int, column: int) -> tuple[str, Style]:
+        """Return the character and the style of a cell, 0-based"""
+        return chr(self._chars[row][column]), self._styles[self._attrs[row][column]]
+
+    def line_styles(self, row: int) -> list[Style]:
+        return [self._styles[_] for _ in self._attrs[row]]
+
+    def snapshot(self, scrollback: bool = True) -> str:
+        """Return the scrollback and the screen as a text, e.g. to be diffed"""
+        lines = self.scrollback if scrollback else []
+        lines += self.display
+        while lines and not lines[-1]:
+            lines.pop()
+        return '\n'.join(lines)
+
+    ##############################################
+
+    def feed(self, data: str | bytes) -> None:
+        """Apply a chunk of the stream, a sequence can be split across chunks."""
+        if isinstance(data, (bytes, bytearray)):
+            data = self._decoder.decode(data)
+        if self._pending:
+            data = self._pending + data
+            self._pending = ''
+        i = data.rfind('\x1b', max(len(data) - self.MAX_SEQUENCE_LENGTH, 0))
+        if i != -1:
+            match = self.SEQUENCE_RE.match(data, i)
+            if match is None or match.lastgroup == 'ctrl':
+                # incomplete sequence
+                self._pending = data[i:]
+                data = data[:i]
+        position = 0
+        search = self.SEQUENCE_RE.search
+        match_csi_run = self.CSI_RUN_RE.match
+        write = self._write_text
+        csi_handlers = self._csi_handlers
+        sgr_cache = self._sgr_cache
+        cup_cache = self._cup_cache
+        columns = self._columns
+        run_length = 16 * columns
+        # end of the lines of texts and SGR sequences already scanned
+        scanned = 0
+        while (match := search(data, position)) is not None:
+            start, end = match.span()
+            params, intermediate, final, osc, esc, ctrl = match.groups()
+            if start > position:
+                text = data[position:start]
+                x = self._x
+                size = start - position
+                if x + size <= columns and '\n' not in text and '\r' not in text:
+                    # a text run within the row, see _write
+                    self._chars[self._y][x:x + size] = array('I', text.encode(UTF32))
+                    self._attrs[self._y][x:x + size] = array('I', (self._style,)) * size
+                    self._x = x + size
+                else:
+                    if final == 'm' and start >= scanned and '\n' in text:
+                        # lines of texts and SGR sequences, e.g. a coloured log, are written at
+                        # once if they scroll the screen, see _scroll_lines
+                        scanned = self._sgr_lines_end(data, start)
+                        if data.count('\n', start, scanned) > self._rows:
+                            write(data[position:scanned])
+                            position = scanned
+                            continue
+                    write(text)
+            position = end
+            if final is not None:
+                if intermediate:
+                    continue
+                if params and params[0] in '<=>?' and (params[0] != '?' or final not in 'hl'):
+                    # private sequences, only the DEC private modes are implemented
+                    continue
+                # SGR and CUP are the most frequent sequences
+                if final == 'm' or final == 'H':
+                    # bound the scan, a run of SGR is only written up to the end of the row
+                    run = match_csi_run(data, start, start + run_length)
+                    if run is not None and run.end() > end:
+                        size = self._write_csi_run(run.group())
+                        if size:
+                            position = start + size
+                            continue
+                    if final == 'm':
+                        style = sgr_cache.get((self._style, params))
+                        if style is not None:
+                            self._style = style
+                            continue
+                    else:
+                        cursor = cup_cache.get(params)
+                        if cursor is not None:
+                            self._y, self._x = cursor
+                            continue
+                handler = csi_handlers.get(final)
+                if handler is not None:
+                    handler(params)
+            elif ctrl is not None:
+                self._control(ctrl)
+            elif osc is not None:
+                self._osc(osc)
+            else:
+                self._escape(esc)
+        if position < len(data):
+            write(data[position:])
+
+    ##############################################
+
+    def _style_id(self, style: Style) -> int:
+        style_id = self._style_ids.get(style)
+        if style_id is None:
+            style_id = len(self._styles)
+            self._styles.append(style)
+            self._style_ids[style] = style_id
+        return style_id
+
+    def _blank_style(self, style: int = None) -> int:
+        # erased cells get the background colour of the current style
+        background = self._styles[self._style if style is None else style].background
+        if background is None:
+            return 0
+        return self._style_id(Style(background=background))
+
+    def _blank_rows(self, n: int) -> tuple[list[array], list[array]]:
+        style = array('I', [self._blank_style()]) * self._columns
+        return [self._space_row[:] for _ in range(n)], [style[:] for _ in range(n)]
+
+    def _blank_screen(self) -> tuple[list[array], list[array]]:
+        chars = [self._space_row[:] for _ in range(self._rows)]
+        attrs = [array('I', [0]) * self._columns for _ in range(self._rows)]
+        return chars, attrs
+
+    def _fill(self, y: int, start: int, stop: int) -> None:
+        # fill the row y from start to stop, excluded
+        size = stop - start
+        if size > 0:
+            self._chars[y][start:stop] = self._space_row[:size]
+            self._attrs[y][start:stop] = array('I', [self._blank_style()]) * size
+
+    ##############################################
+
+    def _sgr_lines_end(self, data: str, start: int) -> int:
+        # Return the end of the lines of texts and SGR sequences starting at start
+        match = self.SGR_LINES_END_RE.search(data, start)
+        end = len(data) if match is None else match.start()
+        return data.rfind('\n', start, end) + 1 or start
+
+    def _write_sgr_text(self, text: str) -> None:
+        # Write a text containing SGR sequences
+        parts = self.SGR_SPLIT_RE.split(text)
+        if parts[0]:
+            self._write(parts[0])
+        for i in range(1, len(parts), 2):
+            self._sgr(parts[i])
+            if parts[i + 1]:
+                self._write(parts[i + 1])
+
+    def _write_text(self, text: str) -> None:
+        # The text can contain SGR sequences, see feed
+        write = self._write_sgr_text if '\x1b' in text else self._write
+        if '\n' not in text and '\r' not in text:
+            write(text)
+            return
+        lines = text.split('\n')
+        # the fast path is tried once, its conditions hold for the remaining lines
+        fast_path = len(lines) > self._rows
+        for i, line in enumerate(lines):
+            if i:
+                if self._newline_mode:
+                    self._x = 0
+                scroll = self._y == self._bottom
+                self._index()
+                if fast_path and scroll and len(lines) - i > self._rows:
+                    if self._scroll_lines(lines[i:]):
+                        return
+                    fast_path = False
+            if '\r' in line:
+                for j, part in enumerate(line.split('\r')):
+                    if j:
+                        self._x = 0
+                    if part:
+                        write(part)
+            elif line:
+                write(line)
+
+    def _scroll_lines(self, lines: list[str]) -> bool:
+        # Fast path to write many lines at the bottom of the screen, each line scrolls the screen.
+        #   The cursor is at the beginning of the bottom row which was just scrolled in.
+        #   Only the last lines can be on the screen or in the scrollback, thus the others are
+        #   skipped.  The lines can contain SGR sequences.
+        #   Return False if the fast path doesn't apply.
+        columns = self._columns
+        rows = self._rows
+        if self._x or self._top or self._bottom != rows - 1 or self._alternate is not None:
+            return False
+        # CR LF is a line separator
+        if not self._newline_mode and not all(_.endswith('\r') for _ in lines[:-1]):
+            return False
+        lines = [_[:-1] if _.endswith('\r') else _ for _ in lines[:-1]] + lines[-1:]
+        if any('\r' in _ for _ in lines):
+            return False
+        if not self.autowrap and max(map(len, lines)) > columns:
+            # the sequences are counted, thus a styled line can be rejected for nothing
+            return False
+        style = self._style
+        # split the lines in rows, a line filling exactly n rows leaves a pending wrap
+        texts = []
+        if not any('\x1b' in _ for _ in lines):
+            # the rows are in the current style
+            row_styles = None
+            if max(map(len, lines)) > columns:
+                for line in lines:
+                    if len(line) > columns:
+                        texts.extend(line[_:_ + columns] for _ in range(0, len(line), columns))
+                    else:
+                        texts.append(line)
+            else:
+                texts = lines
+        else:
+            # the style ids as bytes of a row and the style id of the blank row scrolled in before
+            # the text is written
+            row_styles = []
+            sgr_run_cache = self._sgr_run_cache
+            split = self.SGR_SPLIT_RE.split
+            for line in lines:
+                parts = split(line)
+                line_texts = parts[0::2]
+                key = (style, *parts[1::2])
+                styles, next_style = sgr_run_cache.get(key) or self._sgr_styles(key)
+                text = ''.join(line_texts)
+                attrs = b''.join(map(mul, styles, map(len, line_texts)))
+                if len(text) > columns:
+                    for i in range(0, len(text), columns):
+                        texts.append(text[i:i + columns])
+                        # a wrapped row is scrolled in before its first character is written
+                        blank = array('I', attrs[4 * i:4 * i + 4])[0] if i else style
+                        row_styles.append((attrs[4 * i:4 * (i + columns)], blank))
+                else:
+                    texts.append(text)
+                    row_styles.append((attrs, style))
+                style = next_style
+        if self._scrollback.maxlen is not None:
+            texts = texts[-(self._scrollback.maxlen + rows):]
+            if row_styles is not None:
+                row_styles = row_styles[-len(texts):]
+        new_chars = [array('I', _.ljust(columns).encode(UTF32)) for _ in texts]
+        if row_styles is None:
+            blank_style = self._blank_style()
+            attrs_templates = {}
+            new_attrs = []
+            for text in texts:
+                size = len(text)
+                attrs = attrs_templates.get(size)
+                if attrs is None:
+                    attrs = attrs_templates[size] = (
+                        array('I', [style]) * size + array('I', [blank_style]) * (columns - size)
+                    )
+                new_attrs.append(attrs[:])
+        else:
+            # style id -> blank style id as bytes
+            blanks = {}
+            new_attrs = []
+            for text, (attrs, blank) in zip(texts, row_styles):
+                blank_attrs = blanks.get(blank)
+                if blank_attrs is None:
+                    blank_attrs = blanks[blank] = array('I', [self._blank_style(blank)]).tobytes()
+                new_attrs.append(array('I', attrs + blank_attrs * (columns - len(text))))
+        self._style = style
+        # the first line replaces the bottom row
+        chars = self._chars[:-1] + new_chars
+        attrs = self._attrs[:-1] + new_attrs
+        # the deque drops the rows beyond its maximum length
+        self._scrollback.extend(zip(chars[:-rows], attrs[:-rows]))
+        self._chars = chars[-rows:]
+        self._attrs = attrs[-rows:]
+        self._x = len(texts[-1])
+        return True
+
+    def _write(self, text: str) -> None:
+        columns = self._columns
+        codes = array('I', text.encode(UTF32))
+        style = array('I', [self._style])
+        i = 0
+        size = len(codes)
+        while i < size:
+            if self._x >= columns:
+                # pending wrap
+                if self.autowrap:
+                    self._x = 0
+                    self._index()
+                else:
+                    # the last character overwrites the last column
+                    self._x = columns - 1
+                    i = size - 1
+            n = min(size - i, columns - self._x)
+            x = self._x
+            self._chars[self._y][x:x + n] = codes[i:i + n]
+            self._attrs[self._y][x:x + n] = style * n
+            self._x += n
+            i += n
+
+    def _write_csi_run(self, run: str) -> int:
+        # Fast path to write a run of SGR and CUP sequences and texts, e.g. coloured lines or a
+        # full screen application redrawing its cells.
+        #   The run is split at once, then the runs of SGR only or of CUP only have their own
+        #   fast path, else the sequences are applied one by one and the texts written in a row
+        #   are joined.  A text which doesn't fit in its row stops the run, it is written by
+        #   _write.
+        #   Return the length of the run which was written.
+        # parts is ['', params, final, text, params, final, text, ...]
+        parts = self.CSI_RUN_SPLIT_RE.split(run)
+        finals = parts[2::3]
+        if 'H' not in finals:
+            return self._write_sgr_run(parts[1::3], parts[3::3])
+        if 'm' not in finals:
+            return self._write_cup_run(parts[1::3], parts[3::3])
+        columns = self._columns
+        sgr_cache = self._sgr_cache
+        cup_cache = self._cup_cache
+        style = self._style
+        y = self._y
+        x = start = self._x
+        texts = []
+        styles = []
+        # length of the run written so far
+        length = 0
+        for params, final, text in zip(parts[1::3], finals, parts[3::3]):
+            if final == 'm':
+                _ = sgr_cache.get((style, params))
+                if _ is None:
+                    self._style = style
+                    self._sgr(params)
+                    _ = self._style
+                style = _
+            else:
+                cursor = cup_cache.get(params)
+                if cursor is None:
+                    self._cursor_position(params)
+                    cursor = self._y, self._x
+                if texts:
+                    self._write_row(y, start, texts, styles)
+                    texts = []
+                    styles = []
+                y, x = cursor
+                start = x
+            length += len(params) + 3
+            if text:
+                size = len(text)
+                if x + size > columns:
+                    break
+                texts.append(text)
+                styles += [style] * size
+                x += size
+                length += size
+        if texts:
+            self._write_row(y, start, texts, styles)
+        self._style = style
+        self._y = y
+        self._x = x
+        return length
+
+    def _sgr_styles(self, key: tuple) -> tuple[list[bytes], int]:
+        # Apply the SGR parameters key[1:] to the style id key[0].  Return the style ids as bytes
+        # before and after each SGR, so the attributes of the texts are built at once, and the
+        # last style id.  The result is cached, e.g. the lines of a log have the same colours.
+        style = self._style
+        self._style = key[0]
+        styles = [array('I', [self._style]).tobytes()]
+        for params in key[1:]:
+            self._sgr(params)
+            styles.append(array('I', [self._style]).tobytes())
+        if len(self._sgr_run_cache) >= self.CACHE_SIZE:
+            self._sgr_run_cache.clear()
+        result = self._sgr_run_cache[key] = styles, self._style
+        self._style = style
+        return result
+
+    def _write_sgr_run(self, params: list[str], texts: list[str]) -> int:
+        # Write the texts which fit in the row
+        sizes = list(map(len, texts))
+        x = self._x
+        available = self._columns - x
+        # number of pairs which fit in the row
+        count = len(sizes)
+        if sum(sizes) > available:
+            count = bisect_right(list(accumulate(sizes)), available)
+            if not count:
+                return 0
+            params, texts, sizes = params[:count], texts[:count], sizes[:count]
+        key = (self._style, *params)
+        styles, self._style = self._sgr_run_cache.get(key) or self._sgr_styles(key)
+        size = sum(sizes)
+        if size:
+            self._chars[self._y][x:x + size] = array('I', ''.join(texts).encode(UTF32))
+            self._attrs[self._y][x:x + size] = array('I', b''.join(map(mul, styles[1:], sizes)))
+            self._x = x + size
+        # the length of the sequences and the texts
+        return 3 * count + sum(map(len, params)) + size
+
+    def _write_cup_run(self, params: list[str], texts: list[str]) -> int:
+        # Write each text at its position
+        columns = self._columns
+        chars = self._chars
+        attrs = self._attrs
+        style = array('I', [self._style])
+        codes = array('I', ''.join(texts).encode(UTF32))
+        sizes = list(map(len, texts))
+        # offset of the text in codes
+        offset = 0
+        for i, cursor in enumerate(map(self._cup_cache.get, params)):
+            if cursor is None:
+                self._cursor_position(params[i])
+                cursor = self._y, self._x
+            y, x = cursor
+            size = sizes[i]
+            if x + size > columns:
+                # the length of the sequences and the texts written
+                self._y, self._x = y, x
+                return 3 * (i + 1) + sum(map(len, params[:i + 1])) + offset
+            if size:
+                chars[y][x:x + size] = codes[offset:offset + size]
+                attrs[y][x:x + size] = style * size
+                offset += size
+        self._y = y
+        self._x = x + size
+        return 3 * len(params) + sum(map(len, params)) + offset
+
+    def _write_row(self, y: int, x: int, texts: list[str], styles: list[int]) -> None:
+        size = len(styles)
+        self._chars[y][x:x + size] = array('I', ''.join(texts).encode(UTF32))
+        self._attrs[y][x:x + size] = array('I', styles)
+
+    ##############################################
+
+    def _control(self, char: str) -> None:
+        match char:
+            case '\x0b' | '\x0c':
+                if self._newline_mode:
+                    self._x = 0
+                self._index()
+            case '\b':
+                self._x = max(min(self._x, self._columns - 1) - 1, 0)
+            case '\t':
+                self._x = min((self._x // self.TAB_SIZE + 1) * self.TAB_SIZE, self._columns - 1)
+
+    def _escape(self, char: str) -> None:
+        match char:
+            case '7':
+                self._save_cursor()
+            case '8':
+                self._restore_cursor()
+            case 'D':
+                self._index()
+            case 'E':
+                self._x = 0
+                self._index()
+            case 'M':
+                self._reverse_index()
+            case 'c':
+                self.reset()
+
+    def _osc(self, text: str) -> None:
+        command, _, argument = text.partition(';')
+        if command in ('0', '2'):
+            self.title = argument
+
+    ##############################################
+
+    @classmethod
+    def _int(cls, text: str) -> int:
+        # a malformed parameter is ignored and a huge one is clamped
+        if not text.isdigit():
+            return 0
+        text = text.lstrip('0')
+        if len(text) > 5:
+            return cls.MAX_PARAMETER
+        return min(int(text or 0), cls.MAX_PARAMETER)
+
+    @classmethod
+    def _args(cls, params: str) -> list[int]:
+        # the sub-parameters, e.g. 4:3, are dropped
+        return [cls._int(_.split(':', 1)[0]) for _ in params.split(';')] if params else []
+
+    @classmethod
+    def _arg(cls, params: str, default: int = 1) -> int:
+        # the default is also used for 0
+        if params:
+            return cls._int(params.split(';', 1)[0].split(':', 1)[0]) or default
+        return default
+
+    def _goto(self, y: int, x: int) -> None:
+        self._y = min(max(y, 0), self._rows - 1)
+        self._x = min(max(x, 0), self._columns - 1)
+
+    def _move(self, dy: int, dx: int) -> None:
+        # CUU and CUD stop at the scrolling region
+        y = self._y + dy
+        if dy < 0 and self._y >= self._top:
+            y = max(y, self._top)
+        elif dy > 0 and self._y <= self._bottom:
+            y = min(y, self._bottom)
+        self._goto(y, min(self._x, self._columns - 1) + dx)
+
+    def _cursor_position(self, params: str) -> None:
+        args = self._args(params) + [0, 0]
+        self._goto((args[0] or 1) - 1, (args[1] or 1) - 1)
+        if len(self._cup_cache) >= self.CACHE_SIZE:
+            self._cup_cache.clear()
+        self._cup_cache[params] = self._y, self._x
+
+    def _save_cursor(self) -> None:
+        self._saved_cursor = (self._y, self._x, self._style)
+
+    def _restore_cursor(self) -> None:
+        self._y, self._x, self._style = self._saved_cursor
+
+    ##############################################
+
+    def _index(self) -> None:
+        if self._y == self._bottom:
+            self._scroll_up(1)
+        elif self._y < self._rows - 1:
+            self._y += 1
+
+    def _reverse_index(self) -> None:
+        if self._y == self._top:
+            self._scroll_down(1)
+        elif self._y > 0:
+            self._y -= 1
+
+    def _scroll_up(self, n: int, top: int = None, scrollback: bool = True) -> None:
+        if top is None:
+            top = self._top
+        bottom = self._bottom + 1
+        n = min(n, bottom - top)
+        chars, attrs = self._chars, self._attrs
+        if scrollback and top == 0 and self._alternate is None:
+            # the rows go to the scrollback
+            self._scrollback.extend(zip(chars[:n], attrs[:n]))
+        del chars[top:top + n]
+        del attrs[top:top + n]
+        blank_chars, blank_attrs = self._blank_rows(n)
+        chars[bottom - n:bottom - n] = blank_chars
+        attrs[bottom - n:bottom - n] = blank_attrs
+
+    def _scroll_down(self, n: int, top: int = None) -> None:
+        if top is None:
+            top = self._top
+        bottom = self._bottom + 1
+        n = min(n, bottom - top)
+        chars, attrs = self._chars, self._attrs
+        del chars[bottom - n:bottom]
+        del attrs[bottom - n:bottom]
+        blank_chars, blank_attrs = self._blank_rows(n)
+        chars[top:top] = blank_chars
+        attrs[top:top] = blank_attrs
+
+    def _set_scrolling_region(self, params: str) -> None:
+        args = self._args(params) + [0, 0]
+        top = (args[0] or 1) - 1
+        bottom = (args[1] or self._rows) - 1
+        if top < bottom < self._rows:
+            self._top = top
+            self._bottom = bottom
+            self._goto(0, 0)
+
+    def _insert_lines(self, params: str) -> None:
+        if self._top <= self._y <= self._bottom:
+            self._scroll_down(self._arg(params), top=self._y)
+            self._x = 0
+
+    def _delete_lines(self, params: str) -> None:
+        if self._top <= self._y <= self._bottom:
+            # the lines don't go to the scrollback
+            self._scroll_up(self._arg(params), top=self._y, scrollback=False)
+            self._x = 0
+
+    ##############################################
+
+    def _erase_display(self, params: str) -> None:
+        columns = self._columns
+        x = min(self._x, columns - 1)
+        match self._arg(params, 0):
+            case 0:
+                self._fill(self._y, x, columns)
+                for y in range(self._y + 1, self._rows):
+                    self._fill(y, 0, columns)
+            case 1:
+                for y in range(self._y):
+                    self._fill(y, 0, columns)
+                self._fill(self._y, 0, x + 1)
+            case 2:
+                for y in range(self._rows):
+                    self._fill(y, 0, columns)
+            case 3:
+                self._scrollback.clear()
+
+    def _erase_line(self, params: str) -> None:
+        columns = self._columns
+        x = min(self._x, columns - 1)
+        match self._arg(params, 0):
+            case 0:
+                self._fill(self._y, x, columns)
+            case 1:
+                self._fill(self._y, 0, x + 1)
+            case 2:
+                self._fill(self._y, 0, columns)
+
+    def _erase_characters(self, params: str) -> None:
+        columns = self._columns
+        x = min(self._x, columns - 1)
+        self._fill(self._y, x, x + min(self._arg(params), columns - x))
+
+    def _insert_characters(self, params: str) -> None:
+        columns = self._columns
+        x = min(self._x, columns - 1)
+        n = min(self._arg(params), columns - x)
+        chars, attrs = self._chars[self._y], self._attrs[self._y]
+        chars[x + n:] = chars[x:columns - n]
+        attrs[x + n:] = attrs[x:columns - n]
+        self._fill(self._y, x, x + n)
+
+    def _delete_characters(self, params: str) -> None:
+        columns = self._columns
+        x = min(self._x, columns - 1)
+        n = min(self._arg(params), columns - x)
+        chars, attrs = self._chars[self._y], self._attrs[self._y]
+        chars[x:columns - n] = chars[x + n:]
+        attrs[x:columns - n] = attrs[x + n:]
+        self._fill(self._y, columns - n, columns)
+
+    ##############################################
+
+    def _set_mode(self, params: str, value: bool) -> None:
+        if not params.startswith('?'):
+            return
+        for mode in self._args(params[1:]):
+            match mode:
+                case 7:
+                    self.autowrap = value
+                case 25:
+                    self.cursor_visible = value
+                case 1049:
+                    self._switch_screen(value)
+                case 2004:
+                    self.bracketed_paste = value
+                case 2026:
+                    self.synchronized_output = value
+
+    def _switch_screen(self, alternate: bool) -> None:
+        if alternate == (self._alternate is not None):
+            return
+        if alternate:
+            self._save_cursor()
+            self._alternate = (self._chars, self._attrs)
+            self._chars, self._attrs = self._blank_screen()
+        else:
+            self._chars, self._attrs = self._alternate
+            self._alternate = None
+            self._restore_cursor()
+
+    ##############################################
+
+    @staticmethod
+    def _extended_color(args: list[int], i: int) -> tuple[int | tuple, int]:
+        # Return the colour and the index of the next argument
+        #   38;5;n or 38;2;r;g;b
+        if i + 1 < len(args):
+            match args[i + 1]:
+                case 5 if i + 2 < len(args):
+                    return args[i + 2], i + 3
+                case 2 if i + 4 < len(args):
+                    return tuple(args[i + 2:i + 5]), i + 5
+        return None, len(args)
+
+    @classmethod
+    def _sub_color(cls, args: list[str]) -> int | tuple | None:
+        # ITU T.416 form: 38:5:n, 38:2:r:g:b or 38:2:colour space id:r:g:b
+        kind = cls._int(args[1])
+        if kind == 5 and len(args) > 2:
+            return cls._int(args[2])
+        if kind == 2 and len(args) > 4:
+            return tuple(cls._int(_) for _ in args[-3:])
+        return None
+
+    def _sgr(self, params: str) -> None:
+        key = (self._style, params)
+        style = self._sgr_cache.get(key)
+        if style is None:
+            if len(self._sgr_cache) >= self.CACHE_SIZE:
+                # e.g. a true colour stream, the cache would grow without bound
+                self._sgr_cache.clear()
+            style = self._sgr_cache[key] = self._apply_sgr(params)
+        self._style = style
+
+    def _apply_sgr(self, params: str) -> int:
+        args = self._args(params) or [0]
+        # the sub-parameters, e.g. 4:3 or 38:2::r:g:b
+        sub_args = [_.split(':') for _ in params.split(';')] if ':' in params else None
+        foreground, background, attributes = self._styles[self._style]
+        i = 0
+        while i < len(args):
+            code = args[i]
+            i += 1
+            if sub_args is not None and len(sub_args[i - 1]) > 1:
+                _ = sub_args[i - 1]
+                match code:
+                    case 4:
+                        # underline style, 4:0 is no underline and 4:2 double underline
+                        attributes &= ~RESET_ATTRIBUTES[24]
+                        match self._int(_[1]):
+                            case 0:
+                                pass
+                            case 2:
+                                attributes |= ATTRIBUTES[21]
+                            case _:
+                                attributes |= ATTRIBUTES[4]
+                    case 38:
+                        foreground = self._sub_color(_)
+                    case 48:
+                        background = self._sub_color(_)
+                # the other sub-parameters, e.g. the underline colour 58, are ignored
+                continue
+            if code == 0:
+                foreground = background = None
+                attributes = 0
+            elif code in ATTRIBUTES:
+                attributes |= ATTRIBUTES[code]
+            elif code in RESET_ATTRIBUTES:
+                attributes &= ~RESET_ATTRIBUTES[code]
+            elif 30 <= code <= 37:
+                foreground = code - 30
+            elif code == 38:
+                foreground, i = self._extended_color(args, i - 1)
+            elif code == 39:
+                foreground = None
+            elif 40 <= code <= 47:
+                background = code - 40
+            elif code == 48:
+                background, i = self._extended_color(args, i - 1)
+            elif code == 49:
+                background = None
+            elif code == 58:
+                # underline colour, ignored
+                _, i = self._extended_color(args, i - 1)
+            elif 90 <= code <= 97:
+                foreground = code - 90 + 8
+            elif 100 <= code <= 107:
+                background = code - 100 + 8
+        return self._style_id(Style(foreground, background, attributes))
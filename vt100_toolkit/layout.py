@@ -0,0 +1,332 @@
+####################################################################################################
+#
+# vt100_toolkit — A VT100 library
+# Copyright (C) 2026 Fabrice SALVAIRE
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+####################################################################################################
+
+"""This module implements a text layout engine: word wrapping, justification and overflow.
+
+The text uses the `Terminal.printc` markup, e.g. `<red>red</> text`.  The styles are kept across
+the wrapped lines.
+
+The line breaks of a paragraph are cached with the range of widths for which they are valid: the
+longest line must fit and the first word of each next line must not.  Thus on a terminal resize,
+only the paragraphs whose break points change are wrapped again.
+
+Justification modes are: left, center, right and full.
+
+Overflow modes apply to a word longer than the width:
+- fold: split the word
+- crop: truncate the line
+- ellipsis: truncate the line and append …
+
+"""
+
+####################################################################################################
+
+from bisect import bisect_right
+from typing import Callable
+import math
+import re
+
+from . import vt100
+
+####################################################################################################
+
+__all__ = ['JUSTIFY_MODES', 'OVERFLOW_MODES', 'Paragraph', 'TextLayout', 'parse_markup']
+
+JUSTIFY_MODES = ('left', 'center', 'right', 'full')
+OVERFLOW_MODES = ('fold', 'crop', 'ellipsis')
+
+ELLIPSIS = '…'
+
+type Style = tuple[str, ...]
+type Span = tuple[str, Style]
+
+####################################################################################################
+
+def parse_markup(text: str, unescape: Callable[[str], str] = None) -> list[Span]:
+    """Parse the markup and return a list of (text, style) where style is the tuple of the
+    active style names, the innermost last.
+
+    `unescape` is applied to the text, e.g. `Terminal.unescape`.
+
+    """
+    spans = []
+    start = 0
+    css_stack = []
+    while True:
+        i = text.find('<', start)
+        if i == -1:
+            i = len(text)
+        if i > start:
+            _ = text[start:i]
+            if unescape is not None:
+                _ = unescape(_)
+            spans.append((_, tuple(css_stack)))
+        if i == len(text):
+            break
+        j = text.find('>', i)
+        if j == -1:
+            raise ValueError(f"missing '>' in '{text} @{start}`")
+        name = text[i+1:j]
+        if name.startswith('/'):
+            if css_stack:
+                css_stack.pop()
+        else:
+            css_stack.append(name)
+        start = j + 1
+    return spans
+
+####################################################################################################
+
+class Paragraph:
+
+    """A paragraph of styled text, i.e. a text without line separator."""
+
+    WORD_RE = re.compile(r'\S+')
+
+    ##############################################
+
+    def __init__(self, spans: list[Span]) -> None:
+        self._spans = [_ for _ in spans if _[0]]
+        # offset of each span in the plain text
+        self._offsets = []
+        offset = 0
+        for text, _ in self._spans:
+            self._offsets.append(offset)
+            offset += len(text)
+        self._text = ''.join(_[0] for _ in self._spans)
+        # wrap cache
+        self._overflow = None
+        self._width = None
+        self._breaks = None
+        # the breaks are valid for width in [_min_width, _max_width[
+        self._min_width = 0
+        self._max_width = 0
+
+    ##############################################
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    ##############################################
+
+    def _is_valid(self, width: int, overflow: str) -> bool:
+        if self._breaks is None or overflow != self._overflow:
+            return False
+        return width == self._width or self._min_width <= width < self._max_width
+
+    def wrap(self, width: int, overflow: str = 'fold') -> list[tuple[int, int]]:
+        """Return the lines as a list of (start, end) offsets in the plain text.
+
+        The result is cached, see the module documentation.
+        """
+        if not self._is_valid(width, overflow):
+            self._wrap(width, overflow)
+        return self._breaks
+
+    @property
+    def is_wrapped(self) -> bool:
+        return self._breaks is not None
+
+    def is_valid(self, width: int, overflow: str = 'fold') -> bool:
+        """Test if the cached line breaks are valid for this width"""
+        return self._is_valid(width, overflow)
+
+    def _wrap(self, width: int, overflow: str) -> None:
+        # Greedy algorithm
+        width = max(width, 1)
+        fold = overflow == 'fold'
+        breaks = []
+        # longest line that must fit
+        min_width = 0
+        # shortest width that would pull the first word of the next line
+        max_width = math.inf
+        folded = False
+        line_start = line_end = None
+        word_count = 0
+
+        def close_line():
+            nonlocal min_width
+            breaks.append((line_start, line_end))
+            # a single word longer than the width is cropped, but it is still alone on its line
+            if word_count > 1 or fold:
+                min_width = max(min_width, line_end - line_start)
+
+        for match in self.WORD_RE.finditer(self._text):
+            start, end = match.span()
+            if line_start is not None:
+                if end - line_start <= width:
+                    line_end = end
+                    word_count += 1
+                    continue
+                max_width = min(max_width, end - line_start)
+                close_line()
+            if fold and end - start > width:
+                folded = True
+                while end - start > width:
+                    breaks.append((start, start + width))
+                    start += width
+            line_start, line_end, word_count = start, end, 1
+        if line_start is not None:
+            close_line()
+        else:
+            # empty line
+            breaks.append((0, 0))
+
+        self._breaks = breaks
+        self._overflow = overflow
+        self._width = width
+        if folded:
+            # only valid for this width
+            self._min_width = self._max_width = width
+        else:
+            self._min_width = min_width
+            self._max_width = max_width
+
+    ##############################################
+
+    def _pieces(self, start: int, end: int) -> list[Span]:
+        # Return the spans between the offsets
+        pieces = []
+        i = max(bisect_right(self._offsets, start) - 1, 0)
+        while i < len(self._spans) and self._offsets[i] < end:
+            text, style = self._spans[i]
+            offset = self._offsets[i]
+            text = text[max(start - offset, 0):end - offset]
+            if text:
+                pieces.append((text, style))
+            i += 1
+        return pieces
+
+    @staticmethod
+    def _justify_full(pieces: list[Span], extra: int) -> list[Span]:
+        # distribute the extra spaces over the spaces of the line
+        gaps = sum(_[0].count(' ') for _ in pieces)
+        if not gaps:
+            return pieces
+        quotient, remainder = divmod(extra, gaps)
+        gap = 0
+        justified = []
+        for text, style in pieces:
+            parts = text.split(' ')
+            _ = parts[0]
+            for part in parts[1:]:
+                _ += ' ' * (1 + quotient + (gap < remainder)) + part
+                gap += 1
+            justified.append((_, style))
+        return justified
+
+    def render(
+            self,
+            width: int,
+            style: Callable[[str], str],
+            justify: str = 'left',
+            overflow: str = 'fold',
+    ) -> list[str]:
+        """Return the lines with ANSI escape sequences.
+
+        `style` returns the escape sequence for a style name, e.g. `Terminal.style`.
+        """
+        if justify not in JUSTIFY_MODES:
+            raise ValueError(f"unknown justify mode {justify}")
+        if overflow not in OVERFLOW_MODES:
+            raise ValueError(f"unknown overflow mode {overflow}")
+        breaks = self.wrap(width, overflow)
+        lines = []
+        for i, (start, end) in enumerate(breaks):
+            length = end - start
+            if length > width:
+                # overflow is crop or ellipsis
+                if overflow == 'ellipsis' and width > 1:
+                    pieces = self._pieces(start, start + width - 1)
+                    pieces.append((ELLIPSIS, pieces[-1][1] if pieces else ()))
+                else:
+                    pieces = self._pieces(start, start + width)
+                length = width
+            else:
+                pieces = self._pieces(start, end)
+            extra = width - length
+            left = ''
+            match justify:
+                case 'center':
+                    left = ' ' * (extra // 2)
+                case 'right':
+                    left = ' ' * extra
+                case 'full':
+                    # the last line is not justified
+                    if i < len(breaks) - 1:
+                        pieces = self._justify_full(pieces, extra)
+            lines.append(left + self._render_pieces(pieces, style))
+        return lines
+
+    @staticmethod
+    def _render_pieces(pieces: list[Span], style: Callable[[str], str]) -> str:
+        # each line opens and closes its styles
+        line = ''
+        current = ()
+        for text, _style in pieces:
+            if _style != current:
+                if current:
+                    line += vt100.SGR_RESET
+                line += ''.join(style(_) for _ in _style)
+                current = _style
+            line += text
+        if current:
+            line += vt100.SGR_RESET
+        return line
+
+####################################################################################################
+
+class TextLayout:
+
+    """A sequence of paragraphs, e.g. a scrollback, which is wrapped incrementally."""
+
+    ##############################################
+
+    def __init__(self, justify: str = 'left', overflow: str = 'fold') -> None:
+        self._justify = justify
+        self._overflow = overflow
+        self._paragraphs = []
+
+    ##############################################
+
+    @property
+    def paragraphs(self) -> list[Paragraph]:
+        return self._paragraphs
+
+    def append(self, text: str, unescape: Callable[[str], str] = None) -> None:
+        """Append a text using the markup, it is split in paragraphs at line separators."""
+        spans = []
+        for _, style in parse_markup(text, unescape):
+            parts = _.split('\n')
+            for part in parts[:-1]:
+                spans.append((part, style))
+                self._paragraphs.append(Paragraph(spans))
+                spans = []
+            spans.append((parts[-1], style))
+        self._paragraphs.append(Paragraph(spans))
+
+    def clear(self) -> None:
+        self._paragraphs.clear()
+
+    ##############################################
+
+    def reflow(self, width: int) -> int:
+        """Wrap the paragraphs and return the number of paragraphs which were wrapped again."""
+        count = 0
+        for paragraph in self._paragraphs:
+            if not paragraph.is_valid(width, self._overflow):
+                paragraph.wrap(width, self._overflow)
+                count += 1
+        return count
+
+    def render(self, width: int, style: Callable[[str], str]) -> list[str]:
+        lines = []
+        for paragraph in self._paragraphs:
+            lines += paragraph.render(width, style, self._justify, self._overflow)
+        return lines
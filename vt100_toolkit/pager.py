@@ -0,0 +1,407 @@
+####################################################################################################
+#
+# vt100_toolkit — A VT100 library
+# Copyright (C) 2026 Fabrice SALVAIRE
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+####################################################################################################
+
+"""This module implements a pager for huge outputs.
+
+The file is memory-mapped, thus opening it is instant and the memory footprint doesn't depend on
+its size.  A line index is built in a background thread.  It is sparse: it only stores the offset
+of one line over `LineIndex.STRIDE`, the other lines are found by scanning forward.
+
+Keys:
+- q: quit
+- space, f, page down: next page
+- b, page up: previous page
+- j, enter, down: next line
+- k, up: previous line
+- g, home: first line
+- G, end: last line
+- :n: jump to line n
+- /text: search text forward
+- n: next match
+
+Waiting for the index or searching a huge file shows the progress on the status line, and a key
+stops it.
+
+"""
+
+####################################################################################################
+
+from array import array
+from bisect import bisect_right
+from typing import Iterable
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+
+from . import vt100
+from . import vt100_io
+
+####################################################################################################
+
+__all__ = ['LineIndex', 'Pager']
+
+####################################################################################################
+
+class LineIndex:
+
+    """Index of the line offsets of a memory-mapped file, built in a background thread."""
+
+    #: One offset is stored every STRIDE lines
+    STRIDE = 64
+    CHUNK_SIZE = 16 * 1024**2
+
+    ##############################################
+
+    def __init__(self, data: mmap.mmap | bytes, stride: int = None) -> None:
+        self._data = data
+        self._size = len(data)
+        self._stride = stride or self.STRIDE
+        # _offsets[k] is the offset of the line k * stride
+        self._offsets = array('Q', [0])
+        self._line_count = 0
+        self._indexed = 0
+        self._complete = False
+        self._stop = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._build, daemon=True)
+        self._thread.start()
+
+    ##############################################
+
+    def _build(self) -> None:
+        data = self._data
+        stride = self._stride
+        position = 0
+        line = 0
+        while position < self._size and not self._stop:
+            end = min(position + self.CHUNK_SIZE, self._size)
+            chunk = data[position:end]
+            offsets = []
+            i = chunk.find(b'\n')
+            while i != -1:
+                line += 1
+                if not line % stride:
+                    offsets.append(position + i + 1)
+                i = chunk.find(b'\n', i + 1)
+            with self._condition:
+                self._offsets.extend(offsets)
+                self._line_count = line
+                self._indexed = end
+                self._condition.notify_all()
+            position = end
+        with self._condition:
+            if not self._stop and self._size and data[-1:] != b'\n':
+                # last line without line separator
+                self._line_count += 1
+            self._complete = True
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        self._stop = True
+        self._thread.join()
+
+    ##############################################
+
+    @property
+    def complete(self) -> bool:
+        return self._complete
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines indexed so far, see `complete`"""
+        return self._line_count
+
+    def wait(self, line: int = None, offset: int = None, timeout: float = None) -> bool:
+        """Wait until the line or the offset is indexed, or the index is complete.
+
+        Return False if the timeout expired.
+        """
+        def predicate():
+            if self._complete:
+                return True
+            if line is not None:
+                return self._line_count > line
+            if offset is not None:
+                return self._indexed > offset
+            return False
+        with self._condition:
+            return self._condition.wait_for(predicate, timeout)
+
+    ##############################################
+
+    def offset(self, line: int) -> int:
+        """Return the offset of the 0-based line"""
+        self.wait(line=line)
+        line = min(line, max(self._line_count - 1, 0))
+        with self._condition:
+            offset = self._offsets[line // self._stride]
+        for _ in range(line % self._stride):
+            offset = self._data.find(b'\n', offset) + 1
+        return offset
+
+    def line_at(self, offset: int) -> int:
+        """Return the 0-based line containing the offset"""
+        self.wait(offset=offset)
+        with self._condition:
+            k = bisect_right(self._offsets, offset) - 1
+            start = self._offsets[k]
+        return k * self._stride + self._data[start:offset].count(b'\n')
+
+    def lines(self, line: int, count: int) -> list[bytes]:
+        """Return up to `count` lines starting at the 0-based line, without line separator"""
+        self.wait(line=line + count - 1)
+        if line >= self._line_count:
+            return []
+        data = self._data
+        offset = self.offset(line)
+        lines = []
+        for _ in range(min(count, self._line_count - line)):
+            end = data.find(b'\n', offset)
+            if end == -1:
+                end = self._size
+            lines.append(data[offset:end])
+            offset = end + 1
+        return lines
+
+    def end_of_line(self, line: int) -> int:
+        """Return the offset following the 0-based line and its line separator"""
+        start = self.offset(line)
+        if line >= self._line_count:
+            return start
+        end = self._data.find(b'\n', start)
+        return self._size if end == -1 else end + 1
+
+    def find(self, pattern: bytes, line: int) -> int:
+        """Return the first line after the 0-based line containing pattern, None if not found"""
+        offset = self._data.find(pattern, self.end_of_line(line))
+        if offset == -1:
+            return None
+        return self.line_at(offset)
+
+####################################################################################################
+
+class Pager:
+
+    """Display a file or an iterable of lines page by page, see `Terminal.page`."""
+
+    CONTROL_RE = re.compile(r'[\x00-\x1f\x7f]')
+
+    #: Refresh period of the status line while waiting for the index, in seconds
+    PROGRESS_PERIOD = .2
+    #: The search scans slices of this size, then checks for a key
+    SEARCH_SLICE = 4 * 1024**2
+
+    ##############################################
+
+    def __init__(self, terminal, source: str | os.PathLike | Iterable[str], encoding: str = 'utf-8') -> None:
+        self._terminal = terminal
+        self._encoding = encoding
+        if isinstance(source, (str, os.PathLike)):
+            self._name = str(source)
+            self._file = open(source, 'rb')
+        else:
+            # spool the lines to a temporary file
+            self._name = ''
+            self._file = tempfile.TemporaryFile()
+            for line in source:
+                line = line.encode(encoding)
+                self._file.write(line)
+                # e.g. a file object or splitlines(True) yield the line separators
+                if not line.endswith(b'\n'):
+                    self._file.write(b'\n')
+            self._file.flush()
+        if os.fstat(self._file.fileno()).st_size:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # an empty file cannot be mapped
+            self._data = b''
+        self._index = LineIndex(self._data)
+        self._top = 0
+        self._pattern = None
+        self._message = ''
+
+    ##############################################
+
+    def close(self) -> None:
+        self._index.close()
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    ##############################################
+
+    @property
+    def _page_size(self) -> int:
+        # the last row is the status line
+        return max(self._terminal.size[0] - 1, 1)
+
+    def _format(self, line: bytes, columns: int) -> str:
+        line = line.decode(self._encoding, errors='replace').expandtabs()
+        return self.CONTROL_RE.sub('', line)[:columns]
+
+    def render(self) -> None:
+        terminal = self._terminal
+        rows, columns = terminal.size
+        page_size = max(rows - 1, 1)
+        lines = self._index.lines(self._top, page_size)
+        with terminal.synchronized():
+            for row in range(page_size):
+                terminal.move_cursor(row + 1, 1)
+                if row < len(lines):
+                    terminal.send(self._format(lines[row], columns))
+                terminal.send(vt100.clear_line('end'))
+                terminal.invalidate_cursor()
+            count = self._index.line_count
+            more = '' if self._index.complete else '+'
+            status = self._message or f"line {self._top + 1}/{count}{more}"
+            if self._name and not self._message:
+                status = f"{self._name} {status}"
+            terminal.move_cursor(rows, 1)
+            terminal.send(vt100.SGR_INVERT + status[:columns] + vt100.SGR_RESET)
+            terminal.send(vt100.clear_line('end'))
+            terminal.invalidate_cursor()
+            terminal.flush()
+        self._message = ''
+
+    ##############################################
+
+    def scroll_to(self, line: int) -> None:
+        self._index.wait(line=line + self._page_size - 1)
+        last = max(self._index.line_count - self._page_size, 0)
+        self._top = min(max(line, 0), last)
+
+    def _interrupted(self, stdin: vt100_io.TerminalInput, message: str = None) -> bool:
+        # Show the progress and return True if a key was pressed, the key is consumed
+        if message is not None:
+            self._message = f"{message}, press a key to stop"
+            self.render()
+        if stdin.has_input():
+            stdin.read_key()
+            return True
+        return False
+
+    def _wait_index(
+            self,
+            stdin: vt100_io.TerminalInput,
+            line: int = None,
+            offset: int = None,
+    ) -> bool:
+        # Waiting for the index of a huge file can be long, thus we show the progress and a key
+        # stops waiting.  Return False if interrupted.
+        while not self._index.wait(line=line, offset=offset, timeout=self.PROGRESS_PERIOD):
+            if self._interrupted(stdin, f"indexing line {self._index.line_count}+"):
+                return False
+        return True
+
+    def jump_to(self, stdin: vt100_io.TerminalInput, line: int) -> None:
+        """Scroll to the 0-based line, or to the last line indexed if a key stops waiting"""
+        if not self._wait_index(stdin, line=line + self._page_size - 1):
+            line = self._index.line_count - self._page_size
+        self.scroll_to(line)
+
+    def scroll_to_end(self, stdin: vt100_io.TerminalInput) -> None:
+        self.jump_to(stdin, 2**64)
+
+    def search(self, stdin: vt100_io.TerminalInput, pattern: str = None) -> None:
+        if pattern is not None:
+            self._pattern = pattern.encode(self._encoding)
+        if not self._pattern:
+            return
+        data = self._data
+        size = len(data)
+        # a match can overlap the end of a slice
+        overlap = len(self._pattern) - 1
+        start = self._index.end_of_line(self._top)
+        rendered = time.monotonic()
+        while start < size:
+            end = min(start + self.SEARCH_SLICE, size)
+            offset = data.find(self._pattern, start, min(end + overlap, size))
+            if offset != -1:
+                if self._wait_index(stdin, offset=offset):
+                    self.jump_to(stdin, self._index.line_at(offset))
+                return
+            start = end
+            message = None
+            if time.monotonic() - rendered >= self.PROGRESS_PERIOD:
+                message = f"searching {start * 100 // size}%"
+                rendered = time.monotonic()
+            if start < size and self._interrupted(stdin, message):
+                return
+        self._message = "Pattern not found"
+
+    ##############################################
+
+    def _prompt(self, stdin: vt100_io.TerminalInput, prompt: str) -> str:
+        terminal = self._terminal
+        rows = terminal.size[0]
+        text = ''
+        while True:
+            terminal.move_cursor(rows, 1)
+            terminal.send(prompt + text + vt100.clear_line('end'))
+            terminal.invalidate_cursor()
+            terminal.flush()
+            key = stdin.read_key()
+            match key:
+                case '' | '\x1b':
+                    # end of file or escape
+                    return None
+                case '\r' | '\n':
+                    return text
+                case '\x7f' | '\b':
+                    text = text[:-1]
+                case _ if key.isprintable():
+                    text += key
+
+    def _handle_key(self, stdin: vt100_io.TerminalInput, key: str) -> bool:
+        # Return False to quit
+        match key:
+            case '' | 'q' | 'Q':
+                # an empty key is the end of file, e.g. a hangup
+                return False
+            case ' ' | 'f' | '\x1b[6~':
+                self.scroll_to(self._top + self._page_size)
+            case 'b' | '\x1b[5~':
+                self.scroll_to(self._top - self._page_size)
+            case 'j' | '\r' | '\n' | '\x1b[B' | '\x1bOB':
+                self.scroll_to(self._top + 1)
+            case 'k' | '\x1b[A' | '\x1bOA':
+                self.scroll_to(self._top - 1)
+            case 'g' | '\x1b[H' | '\x1b[1~':
+                self.scroll_to(0)
+            case 'G' | '\x1b[F' | '\x1b[4~':
+                self.scroll_to_end(stdin)
+            case ':':
+                text = self._prompt(stdin, ':')
+                if text and text.isdigit():
+                    self.jump_to(stdin, int(text) - 1)
+            case '/':
+                text = self._prompt(stdin, '/')
+                if text:
+                    self.search(stdin, text)
+            case 'n':
+                self.search(stdin)
+        return True
+
+    def run(self) -> None:
+        terminal = self._terminal
+        terminal.send(vt100.ENTER_ALTERNATE_SCREEN + vt100.HIDE_CURSOR)
+        terminal.invalidate_cursor()
+        try:
+            with vt100_io.TerminalInput() as stdin:
+                while True:
+                    self.render()
+                    if not self._handle_key(stdin, stdin.read_key()):
+                        break
+        finally:
+            terminal.send(vt100.SHOW_CURSOR + vt100.EXIT_ALTERNATE_SCREEN)
+            terminal.flush()
+            terminal.invalidate_cursor()
+            self.close()
@@ -0,0 +1,306 @@
+####################################################################################################
+#
+# vt100_toolkit — A VT100 library
+# Copyright (C) 2026 Fabrice SALVAIRE
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+####################################################################################################
+
+"""This module implements a streaming table renderer.
+
+The rows are read from an iterator.  The column widths are estimated from a sample of the first
+rows, then the rows are printed as they come, thus the latency and the memory don't depend on the
+number of rows.  The iterator is consumed in a background thread, thus the rows are printed by
+batch within `TableRenderer.MAX_LATENCY` even if the source blocks, e.g. a slow query.  For the
+same reason, the source must not be bound to the calling thread, like a sqlite3 cursor.  A cell
+wider than its column is truncated with an ellipsis, or the column is widened for the next rows up
+to the table width, then the header is printed again.
+
+A row is formatted using a template built once for the current column widths, it embeds the
+escape sequences of the column styles.
+
+"""
+
+####################################################################################################
+
+from queue import Empty, SimpleQueue
+from typing import Any, Iterable, Sequence
+import threading
+import time
+
+from . import vt100
+
+####################################################################################################
+
+__all__ = ['Column', 'TableRenderer']
+
+ELLIPSIS = '…'
+
+####################################################################################################
+
+class _EndOfRows:
+
+    """Sent by the reader thread after the last row, or when the source raised `exception`"""
+
+    def __init__(self, exception: BaseException = None) -> None:
+        self.exception = exception
+
+####################################################################################################
+
+class Column:
+
+    ##############################################
+
+    def __init__(
+            self,
+            header: str,
+            style: str = None,
+            justify: str = 'left',
+            width: int = None,
+            max_width: int = None,
+    ) -> None:
+        """`style` is a theme colour name, `width` forces the width."""
+        if justify not in ('left', 'center', 'right'):
+            raise ValueError(f"unknown justify mode {justify}")
+        self.header = str(header)
+        self.style = style
+        self.justify = justify
+        self.width = width
+        self.max_width = max_width
+
+####################################################################################################
+
+class TableRenderer:
+
+    ALIGNMENTS = {
+        'left': '<',
+        'center': '^',
+        'right': '>',
+    }
+
+    #: Number of rows written at once
+    BATCH_SIZE = 256
+
+    #: Maximum delay in seconds to print a row, it bounds the time to read the sample
+    MAX_LATENCY = .1
+
+    #: Number of rows read ahead by the reader thread
+    READ_AHEAD = 4 * BATCH_SIZE
+
+    ##############################################
+
+    def __init__(
+            self,
+            terminal,
+            columns: Sequence[Column | str],
+            sample_size: int = 100,
+            overflow: str = 'ellipsis',
+            separator: str = ' │ ',
+            header_style: str = None,
+            width: int = None,
+    ) -> None:
+        """`overflow` is ellipsis or widen, `width` defaults to the terminal width."""
+        if overflow not in ('ellipsis', 'widen'):
+            raise ValueError(f"unknown overflow mode {overflow}")
+        self._terminal = terminal
+        self._columns = [_ if isinstance(_, Column) else Column(_) for _ in columns]
+        self._sample_size = sample_size
+        self._overflow = overflow
+        self._separator = separator
+        self._header_style = header_style
+        self._width = width
+        self._widths = None
+        # width available for the columns, None if unknown
+        self._available = None
+        self._widened = False
+        self._template = None
+
+    ##############################################
+
+    @property
+    def widths(self) -> list[int]:
+        return self._widths
+
+    ##############################################
+
+    def _table_width(self) -> int:
+        if self._width is not None:
+            return self._width
+        try:
+            return self._terminal.size[1]
+        except OSError:
+            # not a TTY
+            return None
+
+    def _estimate_widths(self, sample: list[list[str]]) -> None:
+        widths = []
+        for i, column in enumerate(self._columns):
+            if column.width is not None:
+                widths.append(column.width)
+                continue
+            width = len(column.header)
+            for row in sample:
+                if i < len(row):
+                    width = max(width, len(row[i]))
+            if column.max_width is not None:
+                width = min(width, column.max_width)
+            widths.append(max(width, 1))
+        # shrink the widest columns to fit the table width
+        table_width = self._table_width()
+        self._available = None
+        if table_width is not None:
+            self._available = available = table_width - len(self._separator) * (len(widths) - 1)
+            while sum(widths) > available and max(widths) > 1:
+                i = widths.index(max(widths))
+                widths[i] -= 1
+        self._widths = widths
+        self._build_template()
+
+    def _build_template(self) -> None:
+        separator = self._separator.replace('{', '{{').replace('}', '}}')
+        parts = []
+        for i, (column, width) in enumerate(zip(self._columns, self._widths)):
+            alignment = self.ALIGNMENTS[column.justify]
+            part = f'{{{i}:{alignment}{width}}}'
+            if column.style is not None:
+                part = self._terminal.style(column.style) + part + vt100.SGR_RESET
+            parts.append(part)
+        self._template = separator.join(parts)
+
+    ##############################################
+
+    def _cells(self, row: Sequence[Any]) -> list[str]:
+        cells = ['' if _ is None else str(_) for _ in row]
+        # pad or drop the missing or extra cells
+        number_of_columns = len(self._columns)
+        if len(cells) < number_of_columns:
+            cells += [''] * (number_of_columns - len(cells))
+        elif len(cells) > number_of_columns:
+            del cells[number_of_columns:]
+        return cells
+
+    def _fit(self, cells: list[str]) -> list[str]:
+        widths = self._widths
+        widen = False
+        for i, cell in enumerate(cells):
+            if len(cell) > widths[i]:
+                column = self._columns[i]
+                if self._overflow == 'widen' and column.width is None:
+                    width = len(cell)
+                    if column.max_width is not None:
+                        width = min(width, column.max_width)
+                    if self._available is not None:
+                        # else the rows would wrap
+                        width = min(width, widths[i] + self._available - sum(widths))
+                    if width > widths[i]:
+                        widths[i] = width
+                        widen = True
+                if len(cell) > widths[i]:
+                    cells[i] = cell[:widths[i]-1] + ELLIPSIS
+        if widen:
+            self._build_template()
+            self._widened = True
+        return cells
+
+    def format_header(self) -> str:
+        cells = self._fit([_.header for _ in self._columns])
+        line = self._separator.join(
+            f'{cell:{self.ALIGNMENTS[column.justify]}{width}}'
+            for cell, column, width in zip(cells, self._columns, self._widths)
+        )
+        if self._header_style is not None:
+            line = self._terminal.style(self._header_style) + line + vt100.SGR_RESET
+        else:
+            line = vt100.SGR_BRIGHT + line + vt100.SGR_RESET
+        return line
+
+    def format_row(self, row: Sequence[Any]) -> str:
+        return self._template.format(*self._fit(self._cells(row)))
+
+    ##############################################
+
+    def _read(
+            self,
+            rows: Iterable[Sequence[Any]],
+            queue: SimpleQueue,
+            stop: threading.Event,
+    ) -> None:
+        # Reader thread: the rows are sent one by one, thus a row is never held while the source
+        # blocks
+        try:
+            for row in rows:
+                while queue.qsize() >= self.READ_AHEAD:
+                    # the renderer is late or stopped
+                    if stop.is_set():
+                        return
+                    time.sleep(.001)
+                queue.put(row)
+            queue.put(_EndOfRows())
+        except BaseException as exception:
+            queue.put(_EndOfRows(exception))
+
+    def _append_row(self, lines: list[str], cells: list[str], header: bool) -> None:
+        line = self._template.format(*self._fit(cells))
+        if self._widened:
+            # the columns don't line up with the header printed above anymore
+            self._widened = False
+            if header:
+                lines.append(self.format_header())
+        lines.append(line)
+
+    def render(self, rows: Iterable[Sequence[Any]], header: bool = True) -> None:
+        terminal = self._terminal
+        queue = SimpleQueue()
+        stop = threading.Event()
+        reader = threading.Thread(target=self._read, args=(iter(rows), queue, stop), daemon=True)
+        reader.start()
+
+        def get(timeout: float = None) -> Sequence[Any] | _EndOfRows | None:
+            # Return the next row, None after the timeout
+            try:
+                row = queue.get(timeout=None if timeout is None else max(timeout, 0))
+            except Empty:
+                return None
+            if type(row) is _EndOfRows and row.exception is not None:
+                # the source failed
+                raise row.exception
+            return row
+
+        try:
+            # Read up to sample_size rows, but stop after MAX_LATENCY
+            sample = []
+            deadline = time.monotonic() + self.MAX_LATENCY
+            row = None
+            while len(sample) < self._sample_size:
+                row = get(deadline - time.monotonic())
+                if row is None or type(row) is _EndOfRows:
+                    break
+                sample.append(self._cells(row))
+            self._estimate_widths(sample)
+            self._widened = False
+            lines = [self.format_header()] if header else []
+            for cells in sample:
+                self._append_row(lines, cells, header)
+            # the first rows are printed immediately
+            if lines:
+                terminal.print('\n'.join(lines))
+            terminal.flush()
+            del sample
+            lines = []
+            flushed = time.monotonic()
+            while type(row) is not _EndOfRows:
+                # wait without timeout if no line is pending
+                row = get(flushed + self.MAX_LATENCY - time.monotonic() if lines else None)
+                if row is not None and type(row) is not _EndOfRows:
+                    self._append_row(lines, self._cells(row), header)
+                    late = time.monotonic() - flushed >= self.MAX_LATENCY
+                    if len(lines) < self.BATCH_SIZE and not late:
+                        continue
+                if lines:
+                    terminal.print('\n'.join(lines))
+                    lines = []
+                terminal.flush()
+                flushed = time.monotonic()
+        finally:
+            # the reader thread stops, e.g. on KeyboardInterrupt, unless the source blocks
+            stop.set()
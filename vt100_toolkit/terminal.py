@@ -20,16 +20,22 @@ See: http://en.wikipedia.org/wiki/ANSI_escape_code
 
 ####################################################################################################
 
-from enum import Enum
-from pathlib import Path
-import colorsys   # rgb_to_hls hls_to_rgb rgb_to_hsv hsv_to_rgb
-import math
+# A CLI can import this module only to print a coloured line, thus the import must be fast.
+# The other modules are imported on demand, in particular `vt100_io` and the TTY machinery
+# when a first query is made.  See test-import-time.py
+
 import os
 import sys
+import time
 
 from .types import Int2, RGBColor
 from . import vt100
-from . import vt100_io
+
+# typing is slow to import
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Iterable, Sequence
+    from .capabilities import Capabilities
 
 ####################################################################################################
 
@@ -38,6 +44,8 @@ LINESEP = os.linesep
 ####################################################################################################
 
 def darken(color: RGBColor, amount: float) -> RGBColor:
+    import colorsys   # rgb_to_hls hls_to_rgb rgb_to_hsv hsv_to_rgb
+    import math
     h, s, v = colorsys.rgb_to_hsv(*color)
     v = v * amount
     v = min(max(math.ceil(v), 0), 255)
@@ -45,24 +53,38 @@ def darken(color: RGBColor, amount: float) -> RGBColor:
 
 ####################################################################################################
 
-class Colors(Enum):
-    red = '#cc5555'
-    green = 0, 200, 0
-    blue = '#0000ff'
-    blue_light = darken((100, 100, 255), .8)
+#: Colour name -> '#rrggbb' or (r, g, b)
+COLORS = {
+    'red': '#cc5555',
+    'green': (0, 200, 0),
+    'blue': '#0000ff',
+    'blue_light': (80, 80, 204),   # darken((100, 100, 255), .8)
+}
+
+def __getattr__(name: str):
+    # The former Colors enumeration is built on demand, enum is slow to import
+    if name == 'Colors':
+        from enum import Enum
+        value = globals()[name] = Enum(name, COLORS, module=__name__)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 ####################################################################################################
 
 class Theme:
-    COLORS = Colors
+
+    #: A mapping or an Enum of colour name -> '#rrggbb' or (r, g, b)
+    COLORS = COLORS
 
     ##############################################
 
     def color(self, name: str) -> RGBColor:
         try:
-            color = self.COLORS[name].value
+            color = self.COLORS[name]
         except KeyError:
             raise ValueError(f"Unknown color {name}")
+        # an Enum member
+        color = getattr(color, 'value', color)
         if isinstance(color, str):
             if color.startswith('#'):
                 return [int(color[_:_+2], 16) for _ in range(1, 6, 2)]
@@ -76,23 +98,65 @@ class Theme:
     ##############################################
 
     def foreground(self, name: str) -> str:
-        rgb = self.color(name)
-        return vt100.foreground(rgb=rgb)
+        # name -> escape sequence, created here since a subclass may not call __init__
+        try:
+            foregrounds = self._foregrounds
+        except AttributeError:
+            foregrounds = self._foregrounds = {}
+        sequence = foregrounds.get(name)
+        if sequence is None:
+            rgb = self.color(name)
+            sequence = foregrounds[name] = vt100.foreground(rgb=rgb)
+        return sequence
+
+####################################################################################################
+
+class _ContextManager:
+
+    """A minimal `contextlib.contextmanager`, contextlib is slow to import"""
+
+    ##############################################
+
+    def __init__(self, value, enter, exit) -> None:
+        self._value = value
+        self._enter = enter
+        self._exit = exit
+
+    def __enter__(self):
+        self._enter()
+        return self._value
+
+    def __exit__(self, type, value, traceback) -> None:
+        self._exit()
 
 ####################################################################################################
 
 class Terminal:
 
-    DEV_TTY = Path('/dev/tty')
+    # a str and not a Path, pathlib is slow to import
+    DEV_TTY = '/dev/tty'
 
     ESCAPING = [
         ('<', '&lt;'),
         ('>', '&gt;'),
     ]
 
+    #: Width used when the output is not a TTY
+    DEFAULT_WIDTH = 80
+
+    #: Delay in seconds to wait for a reply to an optional query, e.g. DECRQM
+    QUERY_TIMEOUT = .2
+
+    #: Maximum duration in seconds of a synchronized update
+    #    After this delay, the output buffered so far is painted, so a long update shows progress.
+    SYNCHRONIZED_UPDATE_TIMEOUT = .1
+
+    #: Default tab stops, used to track the cursor
+    TAB_SIZE = 8
+
     ##############################################
 
-    def __init__(self, theme: Theme = None, debug: bool = False) -> None:
+    def __init__(self, theme: Theme = None, debug: bool = False, cache: bool = True) -> None:
         # Fixme: size and debug is messed !
         if theme is None:
             theme = Theme
@@ -100,26 +164,216 @@ class Terminal:
         self._debug = bool(debug)
         # self._stdout = open(self.DEV_TTY, mode='w')
         self._stdout = sys.stdout
+        # probed capabilities are cached on disk, see capabilities module
+        self._cache = bool(cache)
+        self._capabilities = None
+        self._synchronized_depth = 0
+        # output of the current synchronized update, None outside an update
+        self._synchronized_buffer = None
+        self._synchronized_start = 0
+        # tracked cursor position [row, column], None if unknown
+        self._cursor = None
 
     ##############################################
 
+    def _write(self, text: str) -> None:
+        if self._synchronized_buffer is None:
+            self._stdout.write(text)
+            return
+        self._synchronized_buffer.append(text)
+        if time.monotonic() - self._synchronized_start > self.SYNCHRONIZED_UPDATE_TIMEOUT:
+            # paint what we have, then start a new update
+            self._flush_synchronized_update()
+
     def send(self, sequence: str = '') -> None:
         if self._debug:
             _ = vt100.escape_ansi(sequence)
             print(f"Send ANSI sequence '{_}'")
-        self._stdout.write(sequence)
+        self._write(sequence)
         # self._stdout.flush()
 
+    def flush(self) -> None:
+        self._stdout.flush()
+
     ##############################################
 
-    def query(self, command: str, read_callback) -> None:
-        with vt100_io.TerminalInput(debug=self._debug) as stdin:
+    def query(self, command: str, read_callback, timeout: float = None) -> None:
+        from . import vt100_io
+        with vt100_io.TerminalInput(timeout=timeout, debug=self._debug) as stdin:
             self.send(command)
+            # the query is not delayed by a synchronized update
+            if self._synchronized_buffer is not None:
+                self._flush_synchronized_update()
             self._stdout.flush()
             read_callback(stdin)
 
     ##############################################
 
+    def _query_value(self, command: str, read_callback, timeout: float = None):
+        # query and return the value returned by the callback, None if the terminal didn't answer
+        value = None
+
+        def callback(stdin):
+            nonlocal value
+            value = read_callback(stdin)
+
+        try:
+            self.query(command, callback, timeout=timeout)
+        except TimeoutError:
+            pass
+        return value
+
+    ##############################################
+
+    @property
+    def is_tty(self) -> bool:
+        return self._stdout.isatty() and sys.stdin.isatty()
+
+    def query_device_attributes(self) -> list[int]:
+        return self._query_value(
+            vt100.REPORT_DEVICE_ATTRIBUTES,
+            vt100.device_attributes_callback,
+            self.QUERY_TIMEOUT,
+        )
+
+    def _query_before_device_attributes(self, command: str, parse):
+        # Query followed by DA1, thus a terminal which doesn't support the query doesn't make us
+        # wait for the timeout.  It requires the terminal answers DA1, see `capabilities.probe`.
+        return self._query_value(
+            command + vt100.REPORT_DEVICE_ATTRIBUTES,
+            lambda stdin: parse(vt100.read_until_device_attributes(stdin)),
+            self.QUERY_TIMEOUT,
+        )
+
+    def query_synchronized_output(self) -> bool:
+        """Query the synchronized output mode (DEC 2026) using DECRQM."""
+        state = self._query_before_device_attributes(
+            vt100.REPORT_SYNCHRONIZED_OUTPUT,
+            vt100.parse_mode,
+        )
+        # 0 not recognized, 1 set, 2 reset, 3 permanently set, 4 permanently reset
+        return (
+            state is not None
+            and state[0] == vt100.SYNCHRONIZED_OUTPUT_MODE
+            and state[1] in (1, 2, 3)
+        )
+
+    def query_background_color(self) -> RGBColor:
+        return self._query_before_device_attributes(vt100.REPORT_BACKGROUND_COLOR, vt100.parse_color)
+
+    def query_foreground_color(self) -> RGBColor:
+        return self._query_before_device_attributes(vt100.REPORT_FOREGROUND_COLOR, vt100.parse_color)
+
+    ##############################################
+
+    def _capability_cache_key(self) -> str:
+        from .capabilities import CapabilityCache
+        if self._cache and self.is_tty:
+            return CapabilityCache.key(self._stdout.fileno())
+        return None
+
+    @property
+    def capabilities(self) -> 'Capabilities':
+        """Terminal capabilities, probed once and cached on disk."""
+        if self._capabilities is None:
+            from . import capabilities
+            from .capabilities import CapabilityCache
+            key = self._capability_cache_key()
+            if key is not None:
+                cache = CapabilityCache()
+                self._capabilities = cache.load(key)
+            if self._capabilities is None:
+                self._capabilities = capabilities.probe(self)
+                if key is not None:
+                    cache.save(key, self._capabilities)
+        return self._capabilities
+
+    def invalidate_capabilities(self) -> None:
+        """Forget the capabilities, they will be probed again."""
+        from .capabilities import CapabilityCache
+        key = self._capability_cache_key()
+        if key is not None:
+            CapabilityCache().invalidate(key)
+        self._capabilities = None
+
+    @property
+    def color_depth(self) -> int:
+        return self.capabilities.color_depth
+
+    @property
+    def supports_synchronized_output(self) -> bool:
+        """Test if the terminal supports the synchronized output mode (DEC 2026)."""
+        return self.capabilities.synchronized_output
+
+    ##############################################
+
+    def synchronized(self) -> _ContextManager:
+        """Context manager to batch a frame in a synchronized update.
+
+        The terminal holds the rendering until the end of the update, thus a frame written in
+        several pieces is painted at once.  Nested calls are merged into the outermost update.
+        On terminals that don't support it, nothing is sent.
+
+        The output of the update is buffered and written at once enclosed by the begin and end
+        sequences, thus the terminal is never left waiting for the end of an update, whatever
+        the application does meanwhile, e.g. an error or a blocking call.  A timer thread
+        terminating the update is not used since it would race with the writes of the
+        application.  The buffer is also written if the update lasts more than
+        `SYNCHRONIZED_UPDATE_TIMEOUT` when the next piece is written, or before a query.
+        """
+        return _ContextManager(self, self._enter_synchronized_update, self._exit_synchronized_update)
+
+    def _enter_synchronized_update(self) -> None:
+        if not self.supports_synchronized_output:
+            return
+        if not self._synchronized_depth:
+            self._begin_synchronized_update()
+        self._synchronized_depth += 1
+
+    def _exit_synchronized_update(self) -> None:
+        if not self._synchronized_depth:
+            return
+        self._synchronized_depth -= 1
+        if not self._synchronized_depth:
+            self._flush_synchronized_update()
+            self._synchronized_buffer = None
+
+    def _begin_synchronized_update(self) -> None:
+        self._synchronized_buffer = []
+        self._synchronized_start = time.monotonic()
+
+    def _flush_synchronized_update(self) -> None:
+        # Write the buffered output enclosed by BSU and ESU, then start a new update
+        if self._synchronized_buffer:
+            self._stdout.write(
+                vt100.BEGIN_SYNCHRONIZED_UPDATE
+                + ''.join(self._synchronized_buffer)
+                + vt100.END_SYNCHRONIZED_UPDATE
+            )
+            self._stdout.flush()
+        self._begin_synchronized_update()
+
+    ##############################################
+
+    def bracketed_paste(self) -> _ContextManager:
+        """Context manager to enable the bracketed paste mode.
+
+        A paste is then received as `vt100.PASTE_START`, the text and `vt100.PASTE_END`, thus it
+        can be read at once using `TerminalInput.read_paste` or `TerminalInput.iter_paste`
+        instead of key per key.
+        """
+        def enter():
+            self.send(vt100.ENABLE_BRACKETED_PASTE)
+            self.flush()
+
+        def exit():
+            self.send(vt100.DISABLE_BRACKETED_PASTE)
+            self.flush()
+
+        return _ContextManager(self, enter, exit)
+
+    ##############################################
+
     @property
     def cursor_position(self) -> list[int, int]:
         position = []
@@ -129,6 +383,7 @@ class Terminal:
             position = vt100.cursor_callback(stdin)
 
         self.query(vt100.REPORT_CURSOR_POSITION, callback)
+        self._cursor = position
         return position
 
     @property
@@ -145,34 +400,111 @@ class Terminal:
 
     ##############################################
 
-    def _report_color(self, command: str) -> RGBColor:
-        color = []
-
-        def callback(stdin):
-            nonlocal color
-            color = vt100.color_callback(stdin)
-
-        self.query(command, callback)
-        return color
-
     @property
     def background_color(self) -> RGBColor:
-        return self._report_color(vt100.REPORT_BACKGROUND_COLOR)
+        return self.capabilities.background_color
 
     @property
     def foreground_color(self) -> RGBColor:
-        return self._report_color(vt100.REPORT_FOREGROUND_COLOR)
+        return self.capabilities.foreground_color
 
     @property
     def is_dark_background(self) -> bool:
-        color = colorsys.rgb_to_hls(*self.background_color)
+        # None if the background colour is unknown
+        background_color = self.background_color
+        if background_color is None:
+            return None
+        import colorsys
+        color = colorsys.rgb_to_hls(*background_color)
         return color[1] < 128
 
     ##############################################
 
+    @property
+    def tracked_cursor(self) -> Int2:
+        """Cursor position tracked from the output, None if unknown"""
+        return self._cursor
+
+    def invalidate_cursor(self) -> None:
+        """Forget the cursor position, e.g. after sending a cursor move with `send`"""
+        self._cursor = None
+
+    def _advance_cursor(self, text: str) -> None:
+        # Update the tracked cursor after writing `text`
+        if self._cursor is None:
+            return
+        try:
+            lines, columns = self.size
+        except OSError:
+            # not a TTY
+            self._cursor = None
+            return
+        # Fixme: we assume a character is a cell
+        text = vt100.strip_ansi(text)
+        row, column = self._cursor
+        # offset of the cursor from the beginning of the row, it is equal to columns after the last
+        # column is written: autowrap is then pending until the next character
+        offset = column - 1
+        for i, line in enumerate(text.split('\n')):
+            if i:
+                # the TTY translates LF to CR LF and scrolls at the bottom
+                row = min(row + 1, lines)
+                offset = 0
+            # a line without control characters is handled at once
+            parts = (line,) if line.isprintable() else line
+            for part in parts:
+                match part:
+                    case '\r':
+                        offset = 0
+                    case '\b':
+                        offset = max(min(offset, columns - 1) - 1, 0)
+                    case '\t':
+                        offset = min((offset // self.TAB_SIZE + 1) * self.TAB_SIZE, columns - 1)
+                    case _ if len(part) == 1 and (part < ' ' or part == '\x7f'):
+                        # e.g. a vertical tab or an escape which is not a sequence
+                        self._cursor = None
+                        return
+                    case _:
+                        offset += len(part)
+                        if offset > columns:
+                            # autowrap
+                            row = min(row + (offset - 1) // columns, lines)
+                            offset = (offset - 1) % columns + 1
+            column = offset + 1
+        if column > columns:
+            # a pending wrap depends on the terminal
+            self._cursor = None
+        else:
+            self._cursor = [row, column]
+
+    def move_cursor(self, row: int, column: int, line: str = None) -> None:
+        """Move the cursor to row, column using the shortest sequence.
+
+        If `line` is the text displayed on the target row, the cursor can move forward by
+        overwriting the characters in place.  The caller must guarantee these characters are
+        displayed with the current SGR state, e.g. plain text and no style active, else they would
+        change of style.  If the position is unknown, CUP is used.
+        """
+        if self._cursor is None:
+            sequence = vt100.cursor_position(row, column)
+        else:
+            from .cursor import cursor_motion
+            sequence = cursor_motion(*self._cursor, row, column, line)
+        if sequence:
+            self.send(sequence)
+        self._cursor = [row, column]
+
+    def write(self, text: str) -> None:
+        """Write plain text and track the cursor"""
+        self._write(text)
+        self._advance_cursor(text)
+
+    ##############################################
+
     def clear(self) -> None:
         self.send(vt100.clear_screen())
         self.send(vt100.cursor_position())
+        self._cursor = [1, 1]
 
     ##############################################
 
@@ -229,10 +561,48 @@ class Terminal:
     def print(self, text: str = '') -> None:
         if self._debug:
             print(vt100.escape_ansi(text))
-        self._stdout.write(text + LINESEP)
+        self._write(text + LINESEP)
+        self._advance_cursor(text + '\n')
 
     def printc(self, text: str = '', escaped: bool = False) -> None:
         _ = self._colorize(text, escaped)
         if self._debug:
             print(vt100.escape_ansi(_))
-        self._stdout.write(_ + LINESEP)
+        self._write(_ + LINESEP)
+        self._advance_cursor(_ + '\n')
+
+    def print_wrapped(
+            self,
+            text: str = '',
+            width: int = None,
+            justify: str = 'left',
+            overflow: str = 'fold',
+            escaped: bool = False,
+    ) -> None:
+        """Print a text using the `printc` markup, wrapped to the width, see `layout` module.
+
+        The width defaults to the terminal width.
+        """
+        if width is None:
+            try:
+                width = self.size[1]
+            except OSError:
+                # not a TTY
+                width = self.DEFAULT_WIDTH
+        from .layout import TextLayout
+        layout = TextLayout(justify, overflow)
+        layout.append(text, self.unescape if escaped else None)
+        for line in layout.render(width, self.style):
+            self.print(line)
+
+    def print_table(self, rows: 'Iterable[Sequence]', columns: 'Sequence', **kwargs) -> None:
+        """Print the rows of an iterator as a table, see `table.TableRenderer`"""
+        from .table import TableRenderer
+        TableRenderer(self, columns, **kwargs).render(rows)
+
+    ##############################################
+
+    def page(self, source: 'str | os.PathLike | Iterable[str]') -> None:
+        """Display a file or an iterable of lines in a pager, see `pager` module."""
+        from .pager import Pager
+        Pager(self, source).run()
@@ -21,159 +21,79 @@ See:
 
 ####################################################################################################
 
-from enum import IntEnum, StrEnum
-from typing import IO
-import re
-
 from .types import RGBColor, Int2
 
 ####################################################################################################
 
+# This module is imported by any application, thus the import must be fast:
+#  - the constants are plain strings and integers, the enumerations are defined in `ansi` and
+#    loaded on demand, see __getattr__
+#  - the regular expressions are compiled on demand
+
 DEBUG_ANSI = False
 
 ####################################################################################################
 
-class C0ControlCodes(StrEnum):
-    # https://en.wikipedia.org/wiki/ASCII
-    # first 32 characters of 128 ASCII 7-bit
-    # NULL = 0
-    BELL = '\a'   # 0x07
-    BACKSPACE = '\b'   # 0x08
-    TAB = '\t'   # 0x09
-    LINEFEED = '\n'   # 0x0A
-    FORMFEED = '\f'   # 0x0C
-    CARRIAGE_RETURN = '\r'   # 0x0D
-    ESCAPE = '\033'   # \e 0x1B
-    # end of C0 block, then
-    # SPACE = 0x20
-
-class AnsiStyle(IntEnum):
-    RESET = 0
-    #: Increased intensity
-    BRIGHT = 1
-    #: Decreased intensity
-    FAINT = 2
-    ITALIC = 3
-    UNDERLINE = 4
-    #: slow blinking
-    BLINK = 5
-    #: mainly unsupported
-    RAPID_BLINK = 6
-    #: Reverse Video
-    INVERT = 7
-    HIDE = 8
-    STRIKE = 9
-    # PRIMARY_FONT = 10
-    # Alternative Font = 11 - 19
-    # FRAKTUR = 20
-    DOUBLY_UNDERLINED = 21
-    #: Normal intensity
-    NORMAL = 22
-    #: Neither italic, nor blackletter
-    NOT_ITALIC = 23
-    NOT_UNDERLINE = 24
-    NOT_BLINK = 25
-    # Proportional spacing = 26
-    NOT_INVERT = 27
-    #: Reveal
-    NOT_HIDE = 28
-    NOT_STRIKE = 29
-    # 30–37 Set foreground color
-    FG_BLACK = 30
-    FG_RED = 31
-    FG_GREEN = 32
-    FG_YELLOW = 33
-    FG_BLUE = 34
-    FG_MAGENTA = 35
-    FG_CYAN = 36
-    FG_WHITE = 37
-    #: Set foreground color
-    #    Next arguments are 5;n or 2;r;g;b
-    FOREGROUND = 38
-    #: Default foreground color
-    #    Implementation defined (according to standard)
-    FG_DEFAULT = 39
-    # 40–47 Set background color
-    BG_BLACK = 40
-    BG_RED = 41
-    BG_GREEN = 42
-    BG_YELLOW = 43
-    BG_BLUE = 44
-    BG_MAGENTA = 45
-    BG_CYAN = 46
-    BG_WHITE = 47
-    #: Set background color
-    #    Next arguments are 5;n or 2;r;g;b
-    BACKGROUND = 48
-    #: Default background color
-    #    Implementation defined (according to standard)
-    BG_DEFAULT = 49
-    # Disable proportional spacing = 50
-    # ...
-    # Set bright foreground color = 90 - 97
-    # Set bright background color = 100 - 107
-
-class AnsiForeground(IntEnum):
-    BLACK = 30
-    RED = 31
-    GREEN = 32
-    YELLOW = 33
-    BLUE = 34
-    MAGENTA = 35
-    CYAN = 36
-    WHITE = 37
-    DEFAULT = 39
-
-    # These are fairly well supported, but not part of the standard.
-    BRIGHT_BLACK = 90
-    BRIGHT_RED = 91
-    BRIGHT_GREEN = 92
-    BRIGHT_YELLOW = 93
-    BRIGHT_BLUE = 94
-    BRIGHT_MAGENTA = 95
-    BRIGHT_CYAN = 96
-    BRIGHT_WHITE = 97
-
-class AnsiBackground(IntEnum):
-    BLACK = 40
-    RED = 41
-    GREEN = 42
-    YELLOW = 43
-    BLUE = 44
-    MAGENTA = 45
-    CYAN = 46
-    WHITE = 47
-    DEFAULT = 49
-
-    # These are fairly well supported, but not part of the standard.
-    BRIGHT_BLACK = 100
-    BRIGHT_RED = 101
-    BRIGHT_GREEN = 102
-    BRIGHT_YELLOW = 103
-    BRIGHT_BLUE = 104
-    BRIGHT_MAGENTA = 105
-    BRIGHT_CYAN = 106
-    BRIGHT_WHITE = 107
+BELL = '\a'   # 0x07
+ESCAPE = '\033'   # \e 0x1B
 
+# SGR codes used by this package, see ansi.AnsiStyle
+SGR_RESET_CODE = 0
+SGR_BRIGHT_CODE = 1
+SGR_INVERT_CODE = 7
+SGR_FOREGROUND_CODE = 38
+SGR_BACKGROUND_CODE = 48
 
 # https://en.wikipedia.org/wiki/C0_and_C1_control_codes
 
 #: Control Sequence Introducer
-CSI = C0ControlCodes.ESCAPE + '['   # C1 = 0x9B
+CSI = '\033['   # C1 = 0x9B
 
 #: Operating System Command
-OSC = C0ControlCodes.ESCAPE + ']'   # C1 = 0x9D
+OSC = '\033]'   # C1 = 0x9D
+
+####################################################################################################
+
+_ENUMERATIONS = ('AnsiBackground', 'AnsiForeground', 'AnsiStyle', 'C0ControlCodes')
+
+# name -> pattern, they are compiled on demand
+_PATTERNS = {}
+
+def _match(name: str, buffer: str):
+    import re
+    return re.match(_PATTERNS[name], buffer)
+
+def __getattr__(name: str):
+    if name in _ENUMERATIONS:
+        from . import ansi
+        value = getattr(ansi, name)
+    elif name in _PATTERNS:
+        import re
+        value = re.compile(_PATTERNS[name])
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
 
 ####################################################################################################
 
 def escape_ansi(sequence: str) -> str:
     for a, b in (
-        (C0ControlCodes.ESCAPE, '\\e'),
-        (C0ControlCodes.BELL, '\\a'),
+        (ESCAPE, '\\e'),
+        (BELL, '\\a'),
     ):
         sequence = sequence.replace(a, b)
     return sequence
 
+_PATTERNS['ESCAPE_SEQUENCE_RE'] = r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[^\[\]])'
+
+def strip_ansi(text: str) -> str:
+    """Remove the escape sequences, e.g. to get the printed text"""
+    if ESCAPE not in text:
+        return text
+    import re
+    return re.sub(_PATTERNS['ESCAPE_SEQUENCE_RE'], '', text)
+
 ####################################################################################################
 
 def command(prefix: str, arg: str | int, code: str) -> str:
@@ -297,49 +217,144 @@ def sgr(*args) -> str:
     return csi(args, 'm')
 
 def foreground(rgb: RGBColor) -> str:
-    return sgr(AnsiStyle.FOREGROUND, 2, *rgb)
+    return sgr(SGR_FOREGROUND_CODE, 2, *rgb)
 
 def background(rgb: RGBColor) -> str:
-    return sgr(AnsiStyle.BACKGROUND, 2, *rgb)
+    return sgr(SGR_BACKGROUND_CODE, 2, *rgb)
 
 
-SGR_RESET = sgr(AnsiStyle.RESET)
+SGR_RESET = '\033[0m'   # sgr(SGR_RESET_CODE)
+SGR_BRIGHT = '\033[1m'   # sgr(SGR_BRIGHT_CODE)
+SGR_INVERT = '\033[7m'   # sgr(SGR_INVERT_CODE)
 
 ####################################################################################################
 
 # Reports the cursor position (CPR) by transmitting `ESC[n;mR`,
 # where n is the row and m is the column.
-REPORT_CURSOR_POSITION = csi(6, 'n')
-REPORT_CURSOR_RE = re.compile(r'^\x1b\[(\d*);(\d*)R')
+REPORT_CURSOR_POSITION = '\033[6n'   # csi(6, 'n')
+_PATTERNS['REPORT_CURSOR_RE'] = r'^\x1b\[(\d*);(\d*)R'
 
-REPORT_FOREGROUND_COLOR = osc((10, '?'), C0ControlCodes.BELL)   # '\033]10;?\007'
-REPORT_BACKGROUND_COLOR = osc((11, '?'), C0ControlCodes.BELL)   # '\033]11;?\007'
-REPORT_COLOR_RE = re.compile(r'^\x1b\]\d\d;rgb:([a-f0-9]{4})/([a-f0-9]{4})/([a-f0-9]{4})')
+REPORT_FOREGROUND_COLOR = '\033]10;?\007'   # osc((10, '?'), BELL)
+REPORT_BACKGROUND_COLOR = '\033]11;?\007'   # osc((11, '?'), BELL)
+_PATTERNS['REPORT_COLOR_RE'] = r'^\x1b\]\d\d;rgb:([a-f0-9]{4})/([a-f0-9]{4})/([a-f0-9]{4})'
 
-def cursor_callback(stdin: IO) -> Int2:
+def cursor_callback(stdin: 'vt100_io.TerminalInput') -> Int2:
     buffer = stdin.read(until='R')
     # reading the actual values, but what if a keystroke appears while reading from stdin?
     # As dirty work around, returns None if this fails
     # buffer is \x1b[10;20R
-    matches = REPORT_CURSOR_RE.match(buffer)
+    matches = _match('REPORT_CURSOR_RE', buffer)
     if matches is not None:
         return [int(_) for _ in matches.groups()]
     return None
 
-def color_callback(stdin: IO) -> RGBColor:
-    buffer = stdin.read(until=C0ControlCodes.BELL)
+def parse_color(buffer: str) -> RGBColor:
     # len(buffer) == 24
     # See cursor_callback
     #              123456789 123456789 123
     # buffer is \x1b]11;rgb:2323/2626/2727\a
     #               ]10;rgb:fcfc/fcfc/fcfc\a
-    matches = REPORT_COLOR_RE.match(buffer)
+    matches = _match('REPORT_COLOR_RE', buffer)
     if matches is not None:
         return [int(_[:2], 16) for _ in matches.groups()]
     return None
 
+def color_callback(stdin: 'vt100_io.TerminalInput') -> RGBColor:
+    return parse_color(stdin.read(until=BELL))
+
+# Primary Device Attributes (DA1)
+#   the terminal replies `CSI ? Ps ; ... c`, e.g. \x1b[?62;22c
+#   Almost all terminals answer it, thus it is a good probe to know if a terminal answers at all.
+REPORT_DEVICE_ATTRIBUTES = '\033[0c'   # csi(0, 'c')
+_PATTERNS['REPORT_DEVICE_ATTRIBUTES_RE'] = r'^\x1b\[\?([\d;]*)c'
+
+def device_attributes_callback(stdin: 'vt100_io.TerminalInput') -> list[int]:
+    buffer = stdin.read(until='c')
+    matches = _match('REPORT_DEVICE_ATTRIBUTES_RE', buffer)
+    if matches is not None:
+        return [int(_) for _ in matches.group(1).split(';') if _]
+    return None
+
+# A query followed by DA1
+#   The terminal replies in order, and a terminal which doesn't support the query only replies to
+#   DA1.  Thus reading up to the DA1 reply never waits for a reply that will not come.
+_PATTERNS['DEVICE_ATTRIBUTES_END_RE'] = r'\x1b\[\?[\d;]*c$'
+
+def read_until_device_attributes(stdin: 'vt100_io.TerminalInput') -> str:
+    """Read the replies up to the DA1 reply included."""
+    import re
+    buffer = ''
+    while True:
+        buffer += stdin.read(until='c')
+        # a colour reply can contain a c
+        if re.search(_PATTERNS['DEVICE_ATTRIBUTES_END_RE'], buffer):
+            return buffer
+
+####################################################################################################
+
+# DEC private modes
+#   CSI ? Pm h   DECSET   set mode
+#   CSI ? Pm l   DECRST   reset mode
+#   CSI ? Pm $ p DECRQM   request mode, the terminal replies `CSI ? Pm ; Ps $ y`
+
+#: Synchronized output, see https://gist.github.com/christianparpart/d8a62cc1ab659194337d73e399004036
+SYNCHRONIZED_OUTPUT_MODE = 2026
+
+def set_private_mode(mode: int) -> str:
+    return csi(f'?{mode}', 'h')
+
+def reset_private_mode(mode: int) -> str:
+    return csi(f'?{mode}', 'l')
+
+def request_private_mode(mode: int) -> str:
+    return csi(f'?{mode}', '$p')
+
+
+#: Show the cursor (DECTCEM)
+CURSOR_VISIBLE_MODE = 25
+#: Alternate screen buffer, the main screen is restored on exit
+ALTERNATE_SCREEN_MODE = 1049
+
+#: Bracketed paste, the pasted text is enclosed by PASTE_START and PASTE_END
+BRACKETED_PASTE_MODE = 2004
+
+SHOW_CURSOR = set_private_mode(CURSOR_VISIBLE_MODE)
+HIDE_CURSOR = reset_private_mode(CURSOR_VISIBLE_MODE)
+ENTER_ALTERNATE_SCREEN = set_private_mode(ALTERNATE_SCREEN_MODE)
+EXIT_ALTERNATE_SCREEN = reset_private_mode(ALTERNATE_SCREEN_MODE)
+ENABLE_BRACKETED_PASTE = set_private_mode(BRACKETED_PASTE_MODE)
+DISABLE_BRACKETED_PASTE = reset_private_mode(BRACKETED_PASTE_MODE)
+PASTE_START = csi(200, '~')   # '\033[200~'
+PASTE_END = csi(201, '~')   # '\033[201~'
+
+BEGIN_SYNCHRONIZED_UPDATE = set_private_mode(SYNCHRONIZED_OUTPUT_MODE)   # '\033[?2026h'
+END_SYNCHRONIZED_UPDATE = reset_private_mode(SYNCHRONIZED_OUTPUT_MODE)   # '\033[?2026l'
+REPORT_SYNCHRONIZED_OUTPUT = request_private_mode(SYNCHRONIZED_OUTPUT_MODE)   # '\033[?2026$p'
+
+_PATTERNS['REPORT_MODE_RE'] = r'^\x1b\[\?(\d+);(\d+)\$y'
+
+def mode_callback(stdin: 'vt100_io.TerminalInput') -> Int2:
+    """Reads a DECRQM report and returns `[mode, state]`.
+
+    The state is 0 if the mode is not recognized, 1 if set, 2 if reset,
+    3 if permanently set and 4 if permanently reset.
+    """
+    return parse_mode(stdin.read(until='y'))
+
+def parse_mode(buffer: str) -> Int2:
+    # buffer is \x1b[?2026;2$y
+    matches = _match('REPORT_MODE_RE', buffer)
+    if matches is not None:
+        return [int(_) for _ in matches.groups()]
+    return None
+
 ####################################################################################################
 
 def set_title(title: str) -> str:
     # Doesn't work with Konsole
-    return osc((2, title), C0ControlCodes.BELL)
+    return osc((2, title), BELL)
+
+####################################################################################################
+
+# a star import loads the names defined on demand
+__all__ = [_ for _ in globals() if not _.startswith('_')] + list(_ENUMERATIONS) + list(_PATTERNS)
@@ -12,7 +12,10 @@
 
 ####################################################################################################
 
-from typing import Callable, Self
+from typing import Callable, Iterator, Self
+import codecs
+import os
+import select
 import termios
 import tty
 import sys
@@ -28,8 +31,23 @@ class TerminalInput:
 
     ##############################################
 
-    def __init__(self, debug: bool = False) -> None:
+    #: Size of a read when receiving a paste
+    PASTE_CHUNK_SIZE = 64 * 1024
+
+    #: Time to wait for a late reply after a query timed out, in seconds
+    LATE_REPLY_TIMEOUT = .1
+
+    ##############################################
+
+    def __init__(self, timeout: float = None, debug: bool = False, paste_limit: int = None) -> None:
+        # timeout in seconds, None means wait forever
+        self._timeout = timeout
+        # maximum size of a paste in characters for read_paste, None means unlimited
+        self._paste_limit = paste_limit
         self._debug = bool(debug)
+        # bytes read after the end of a paste
+        self._pending = b''
+        self._timed_out = False
 
     ##############################################
 
@@ -51,9 +69,20 @@ class TerminalInput:
     ##############################################
 
     def __exit__(self, type, value, traceback) -> None:
+        if self._timed_out:
+            self._discard_late_reply()
         # restore tty attributes
         termios.tcsetattr(self._fileno, termios.TCSANOW, self._terminal_attribute)
 
+    def _discard_late_reply(self) -> None:
+        # After a timeout, the reply can still come.  Once the attributes are restored, it would be
+        # echoed to the shell, e.g. ^[[?2026;2$y, or read as keystrokes.  Thus we wait a little
+        # and discard the input.
+        select.select([self._fileno], [], [], self.LATE_REPLY_TIMEOUT)
+        termios.tcflush(self._fileno, termios.TCIFLUSH)
+        self._pending = b''
+        self._timed_out = False
+
     ##############################################
 
     def _debug_read(self, buffer: str) -> None:
@@ -62,9 +91,21 @@ class TerminalInput:
 
     ##############################################
 
+    def _read_bytes(self, size: int) -> bytes:
+        # read up to size bytes, the pending bytes first
+        if self._pending:
+            buffer = self._pending[:size]
+            self._pending = self._pending[size:]
+            return buffer
+        return os.read(self._fileno, size)
+
+    ##############################################
+
     def read(self, until: str) -> str:
         # It only works if the terminal is set in `cbreak` mode
         # See `query` method
+        if self._timeout is not None:
+            return self._read_timeout(until)
         buffer = ''
         while True:
             buffer += self._stdin.read(1)
@@ -73,3 +114,121 @@ class TerminalInput:
         if self._debug:
             self._debug_read(buffer)
         return buffer
+
+    ##############################################
+
+    def _read_timeout(self, until: str) -> str:
+        # Some terminals never answer to a query, thus we cannot block on the buffered text stream.
+        # Instead we wait on the file descriptor and read it byte per byte.
+        # Raise TimeoutError if the terminal didn't answer in time.
+        buffer = b''
+        terminator = until.encode()
+        while True:
+            ready = self._pending or select.select([self._fileno], [], [], self._timeout)[0]
+            if not ready:
+                self._timed_out = True
+                if self._debug:
+                    self._debug_read(buffer.decode(errors='replace'))
+                raise TimeoutError(f"TTY didn't answer within {self._timeout} s")
+            buffer += self._read_bytes(1)
+            if buffer.endswith(terminator):
+                break
+        buffer = buffer.decode(errors='replace')
+        if self._debug:
+            self._debug_read(buffer)
+        return buffer
+
+    ##############################################
+
+    def has_input(self, timeout: float = 0) -> bool:
+        """Test if the input can be read within the timeout in seconds, e.g. a key was pressed."""
+        return bool(self._pending or select.select([self._fileno], [], [], timeout)[0])
+
+    def read_key(self, escape_timeout: float = .05) -> str:
+        """Read a key, i.e. a character or an escape sequence like `\\e[A` for the up arrow.
+
+        Return an empty string at the end of file, e.g. a hangup.
+        """
+        # Read the file descriptor, see _read_timeout
+        buffer = self._read_bytes(1)
+        if buffer == b'\x1b':
+            # a lone ESC or an escape sequence?
+            ready = self._pending or select.select([self._fileno], [], [], escape_timeout)[0]
+            if ready:
+                buffer += self._read_bytes(1)
+                if buffer[-1:] in (b'[', b'O'):
+                    # read until the final byte in the range @ to ~
+                    while True:
+                        buffer += self._read_bytes(1)
+                        if 0x40 <= buffer[-1] <= 0x7e:
+                            break
+        elif buffer and buffer[0] >= 0xc0:
+            # UTF-8 leading byte, 0b110xxxxx 0b1110xxxx 0b11110xxx
+            length = 2 if buffer[0] < 0xe0 else 3 if buffer[0] < 0xf0 else 4
+            while len(buffer) < length:
+                buffer += self._read_bytes(length - len(buffer))
+        buffer = buffer.decode(errors='replace')
+        if self._debug:
+            self._debug_read(buffer)
+        return buffer
+
+    ##############################################
+
+    def iter_paste(self, chunk_size: int = None) -> Iterator[str]:
+        """Yield the chunks of a bracketed paste, see `Terminal.bracketed_paste`.
+
+        It must be called after `read_key` returned `vt100.PASTE_START`.  The input is read by
+        large chunks up to the end marker, which is not yielded.
+        """
+        if chunk_size is None:
+            chunk_size = self.PASTE_CHUNK_SIZE
+        end = vt100.PASTE_END.encode()
+        # the end marker can be split across two reads, thus keep its length minus one byte
+        tail = len(end) - 1
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        buffer = self._pending
+        self._pending = b''
+        while True:
+            i = buffer.find(end)
+            if i != -1:
+                self._pending = buffer[i+len(end):]
+                chunk = decoder.decode(buffer[:i], final=True)
+                if chunk:
+                    yield chunk
+                return
+            if len(buffer) > tail:
+                chunk = decoder.decode(buffer[:-tail])
+                buffer = buffer[-tail:]
+                if chunk:
+                    yield chunk
+            data = os.read(self._fileno, chunk_size)
+            if not data:
+                # end of file
+                chunk = decoder.decode(buffer, final=True)
+                if chunk:
+                    yield chunk
+                return
+            buffer += data
+
+    def read_paste(self) -> str:
+        """Read a bracketed paste and return it as a single string, see `iter_paste`.
+
+        Raise ValueError if the paste exceeds the `paste_limit`, the paste is consumed anyway.
+        """
+        chunks = []
+        size = 0
+        overflow = False
+        for chunk in self.iter_paste():
+            size += len(chunk)
+            if self._paste_limit is not None and size > self._paste_limit:
+                # drop the chunk but drain the input up to the end marker
+                overflow = True
+                chunks = []
+            if not overflow:
+                chunks.append(chunk)
+        if overflow:
+            raise ValueError(f"paste exceeds {self._paste_limit} characters")
+        buffer = ''.join(chunks)
+        if self._debug:
+            self._debug_read(buffer[:80])
+        return buffer